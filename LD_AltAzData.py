@@ -0,0 +1,215 @@
+"""
+Container for the alt/az tracks of lots of satellites calculated by
+LD_PassFinder.
+
+Rather than a pandas DataFrame (with a column of astropy Time objects!) per
+satellite, everything is kept in (n_sats x n_times) numpy arrays that share
+one time vector. Per satellite views are free, DataFrames are only made when
+asked for. The time vector is only converted to datetimes once (per time
+zone) and every pass or DataFrame takes a slice of that.
+"""
+
+import datetime
+import logging
+
+import numpy as np
+import pandas as pd
+
+import LD_Transform
+
+log = logging.getLogger(__name__)
+
+def To_Datetimes(utc_Times, tz=datetime.timezone.utc):
+    """
+    astropy Time (scalar or array) to datetime(s) in time zone tz. astropy's
+    to_datetime is about 50 times slower with a time zone than without one,
+    so the time zone is put on here instead.
+    """
+
+    naive = utc_Times.to_datetime()
+    if np.ndim(naive) == 0:
+        return naive.replace(tzinfo=datetime.timezone.utc).astimezone(tz)
+    return np.array([x.replace(tzinfo=datetime.timezone.utc).astimezone(tz) for x in naive.ravel()],
+                    dtype=object).reshape(naive.shape)
+
+class LD_AltAzData:
+    """
+    Alt/az (and optionally range) of many satellites on a common time grid.
+    """
+
+    def __init__(self, tles, utc_Times, alt, az, distance=None, dtype=np.float64,
+                 location=None, sunlit=None, range_Rate=None):
+        """
+        tles: list of LD_MyTLE objects, one per row of the arrays.
+        utc_Times: astropy Time array, one per column of the arrays.
+        alt, az: (n_sats x n_times) arrays in degrees.
+        distance: optional (n_sats x n_times) array of range in km.
+        dtype: float type to store the arrays as (float32 halves the memory).
+        location: EarthLocation the alt/az are from.
+        sunlit: optional (n_sats x n_times) boolean array, True where the
+        satellite is out of the earth's shadow.
+        range_Rate: optional (n_sats x n_times) array of range rate in km/s
+        (positive moving away).
+        """
+
+        self.tles = list(tles)
+        self.utc_Times = utc_Times
+        self.location = location
+        self.alt = np.ascontiguousarray(alt, dtype=dtype).reshape(len(self.tles), len(utc_Times))
+        self.az = np.ascontiguousarray(az, dtype=dtype).reshape(self.alt.shape)
+        if distance is not None:
+            distance = np.ascontiguousarray(distance, dtype=dtype).reshape(self.alt.shape)
+        self.distance = distance
+        if sunlit is not None:
+            sunlit = np.ascontiguousarray(sunlit, dtype=bool).reshape(self.alt.shape)
+        self.sunlit = sunlit
+        if range_Rate is not None:
+            range_Rate = np.ascontiguousarray(range_Rate, dtype=dtype).reshape(self.alt.shape)
+        self.range_Rate = range_Rate
+        # utc_Times as datetimes, by time zone (see Datetimes).
+        self.datetimes = {}
+        # What the passes in these tracks are kept under in the pass finder's
+        # track cache, if they came from there.
+        self.cache_Key = None
+
+        log.debug(f"Stored tracks for {len(self.tles)} satellites, {self.nbytes / 1e6:.1f} MB")
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the track arrays.
+        """
+        total = self.alt.nbytes + self.az.nbytes
+        if self.distance is not None:
+            total += self.distance.nbytes
+        if self.sunlit is not None:
+            total += self.sunlit.nbytes
+        if self.range_Rate is not None:
+            total += self.range_Rate.nbytes
+        return total
+
+    def __len__(self):
+        return len(self.tles)
+
+    def __getitem__(self, i):
+        """
+        The old format, [tle, DataFrame], so this can be iterated like the
+        list of DataFrames it replaces. Prefer View() where possible.
+        """
+        return [self.tles[i], self.To_DataFrame(i)]
+
+    def Datetimes(self, tz=datetime.timezone.utc):
+        """
+        Object array of the time stamps as datetimes in time zone tz. Made
+        the first time it's asked for and kept, astropy is slow at making
+        datetimes (and much slower at making Time scalars) so this is much
+        quicker than converting times for each pass separately.
+        """
+
+        if tz not in self.datetimes:
+            self.datetimes[tz] = To_Datetimes(self.utc_Times, tz)
+        return self.datetimes[tz]
+
+    def Pass(self, i, start, stop):
+        """
+        LD_PassTrack of satellite i from time stamp start up to but not
+        including stop.
+        """
+        return LD_PassTrack(self, i, start, stop)
+
+    def View(self, i):
+        """
+        Dict of the (zero copy) alt, az, range, sunlit and range rate arrays
+        of satellite i (the last three if there are any).
+        """
+
+        view = {"alt": self.alt[i], "az": self.az[i]}
+        if self.distance is not None:
+            view["range"] = self.distance[i]
+        if self.sunlit is not None:
+            view["sunlit"] = self.sunlit[i]
+        if self.range_Rate is not None:
+            view["range_rate"] = self.range_Rate[i]
+        return view
+
+    def To_DataFrame(self, i, start=0, stop=None):
+        """
+        Make the DataFrame of satellite i (optionally just the time stamps
+        from start up to but not including stop), with a "time" column of
+        UTC datetimes (see Datetimes). If there are range rates, the Doppler
+        factor (see LD_Transform.Doppler_Factor) is added alongside them.
+        """
+
+        if stop is None:
+            stop = len(self.utc_Times)
+        data = {
+            "time": self.Datetimes()[start:stop],
+            "alt": self.alt[i, start:stop],
+            "az": self.az[i, start:stop]
+            }
+        if self.distance is not None:
+            data["range"] = self.distance[i, start:stop]
+        if self.sunlit is not None:
+            data["sunlit"] = self.sunlit[i, start:stop]
+        if self.range_Rate is not None:
+            data["range_rate"] = self.range_Rate[i, start:stop]
+            data["doppler"] = LD_Transform.Doppler_Factor(data["range_rate"].astype(np.float64))
+        return pd.DataFrame(data, index=range(start, stop))
+
+class LD_PassTrack:
+    """
+    The track of one satellite during one pass, the pass data part of each
+    line of LD_PassFinder.Filter_Passes. Nothing is copied or converted until
+    a column is asked for: track["time"] (UTC datetimes), track["alt"] etc.
+    give arrays of whichever columns To_DataFrame would have, and
+    DataFrame() makes the DataFrame.
+    """
+
+    def __init__(self, data, row, start, stop, base=0):
+        """
+        data: the LD_AltAzData the pass is in, or a function that makes it
+        (called the first time anything is asked for).
+        row: which satellite of data the pass is.
+        start, stop: time stamp numbers of the pass (stop not included).
+        base: the time stamp number of the first column of data.
+        """
+
+        self.data = data
+        self.row = row
+        self.start = start
+        self.stop = stop
+        self.base = base
+
+    def _Data(self):
+        if callable(self.data):
+            self.data = self.data()
+        return self.data
+
+    def __len__(self):
+        return self.stop - self.start
+
+    @property
+    def index(self):
+        """
+        The time stamp numbers of the pass, like a DataFrame's index.
+        """
+        return pd.RangeIndex(self.start, self.stop)
+
+    def __getitem__(self, column):
+        data = self._Data()
+        columns = slice(self.start - self.base, self.stop - self.base)
+        if column == "time":
+            return data.Datetimes()[columns]
+        if column == "doppler":
+            return LD_Transform.Doppler_Factor(self["range_rate"].astype(np.float64))
+        return data.View(self.row)[column][columns]
+
+    def DataFrame(self):
+        """
+        The pass as a DataFrame (see LD_AltAzData.To_DataFrame), indexed by
+        time stamp number.
+        """
+
+        frame = self._Data().To_DataFrame(self.row, self.start - self.base, self.stop - self.base)
+        frame.index = self.index
+        return frame
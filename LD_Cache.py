@@ -0,0 +1,141 @@
+"""
+Simple on-disk cache of numpy arrays, for keeping results between runs of
+the pass finder (or between presses of the Process button in the GUI).
+
+Each entry is an .npz file named after a hash of its key. Entries carry a
+checksum of their contents which is checked when they are read back, and the
+least recently used entries are deleted when the cache gets too big.
+"""
+
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+def Make_Key(*parts):
+    """
+    Hash anything with a stable repr (strings, numbers, tuples of them) into
+    a cache key.
+    """
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+def _Checksum(arrays):
+    """
+    Hash of the names, shapes, types and contents of a dict of arrays.
+    """
+
+    digest = hashlib.sha256()
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        digest.update(f"{name}{array.shape}{array.dtype.str}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+class LD_Cache:
+    """
+    Size bounded, least recently used cache of dicts of numpy arrays.
+    """
+
+    def __init__(self, path, max_MB=200):
+        """
+        path: folder to keep the cache files in (made if it doesn't exist).
+        max_MB: once the files add up to more than this, the least recently
+        used ones are deleted.
+        """
+
+        self.path = path
+        self.max_Bytes = max_MB * 1e6
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        log.debug(f"Cache in {self.path}, max {max_MB} MB")
+
+    def _Filename(self, key):
+        return os.path.join(self.path, f"{key}.npz")
+
+    def Get(self, key):
+        """
+        Return the dict of arrays stored under key, or None if there isn't
+        one (or it was corrupted, in which case it is deleted).
+        """
+
+        filename = self._Filename(key)
+        if not os.path.exists(filename):
+            return None
+
+        try:
+            with np.load(filename, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+            checksum = str(arrays.pop("_checksum"))
+        except Exception as err:
+            log.warning(f"Couldn't read cache file {filename} ({err}), deleting it")
+            self._Remove(filename)
+            return None
+
+        if checksum != _Checksum(arrays):
+            log.warning(f"Cache file {filename} failed its checksum, deleting it")
+            self._Remove(filename)
+            return None
+
+        # Touch the file so it counts as recently used.
+        os.utime(filename)
+        return arrays
+
+    def Put(self, key, arrays, evict=True):
+        """
+        Store a dict of arrays under key, then trim the cache back down to
+        size (if putting lots of things in at once, pass evict=False and call
+        Evict() at the end instead).
+        """
+
+        filename = self._Filename(key)
+        # Write to a temporary file and move it into place so a crash half
+        # way through can't leave a broken entry.
+        temp = f"{filename}.{os.getpid()}.tmp"
+        with open(temp, "wb") as f:
+            np.savez(f, _checksum=np.array(_Checksum(arrays)), **arrays)
+        os.replace(temp, filename)
+        if evict:
+            self.Evict()
+
+    def _Remove(self, filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+    def Evict(self):
+        """
+        Delete the least recently used entries until the cache fits in
+        max_MB.
+        """
+
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(".npz"):
+                continue
+            filename = os.path.join(self.path, name)
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename))
+
+        total = sum(x[1] for x in entries)
+        for _, size, filename in sorted(entries):
+            if total <= self.max_Bytes:
+                break
+            log.debug(f"Evicting {filename} from cache")
+            self._Remove(filename)
+            total -= size
+
+    def Clear(self):
+        """
+        Delete everything in the cache.
+        """
+
+        for name in os.listdir(self.path):
+            if name.endswith(".npz"):
+                self._Remove(os.path.join(self.path, name))
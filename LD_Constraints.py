@@ -0,0 +1,222 @@
+"""
+Constraints on when a satellite can actually be tracked, for
+LD_PassFinder.Filter_Passes.
+
+Each constraint turns the (n_sats x n_times) arrays of an LD_AltAzData into
+a boolean mask of when it's satisfied, all satellites at once. Constraints
+can be combined with & (all of), | (any of) and ~ (not), and Filter_Passes
+finds the passes in the combined mask, so adding constraints doesn't add any
+python loops over satellites or time stamps.
+
+Usage:
+    - Make some constraints, eg
+        Min_Alt(20) & Az_Sector(90, 270) & Max_Range(1500)
+    - Pass them to LD_PassFinder.Filter_Passes(alt_Filter, constraints=...)
+"""
+
+import logging
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+class Constraint:
+    """
+    Base class. Subclasses implement Mask().
+    """
+
+    def Mask(self, data, transform):
+        """
+        Boolean (n_sats x n_times) array, True where the constraint is
+        satisfied. data is an LD_AltAzData, transform is the LD_Transform for
+        its time stamps and site (for anything that needs the Sun etc).
+        """
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return All(self, other)
+
+    def __or__(self, other):
+        return Any(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+    def __repr__(self):
+        args = ", ".join(f"{key}={value!r}" for key, value in vars(self).items())
+        return f"{type(self).__name__}({args})"
+
+
+class All(Constraint):
+    """
+    Satisfied when all of the constraints are.
+    """
+
+    def __init__(self, *constraints):
+        self.constraints = constraints
+
+    def Mask(self, data, transform):
+        mask = np.ones(data.alt.shape, dtype=bool)
+        for constraint in self.constraints:
+            mask &= constraint.Mask(data, transform)
+        return mask
+
+
+class Any(Constraint):
+    """
+    Satisfied when any of the constraints are.
+    """
+
+    def __init__(self, *constraints):
+        self.constraints = constraints
+
+    def Mask(self, data, transform):
+        mask = np.zeros(data.alt.shape, dtype=bool)
+        for constraint in self.constraints:
+            mask |= constraint.Mask(data, transform)
+        return mask
+
+
+class Not(Constraint):
+    """
+    Satisfied when the constraint isn't.
+    """
+
+    def __init__(self, constraint):
+        self.constraint = constraint
+
+    def Mask(self, data, transform):
+        return ~self.constraint.Mask(data, transform)
+
+
+class Min_Alt(Constraint):
+    """
+    At least alt degrees above the horizon.
+    """
+
+    def __init__(self, alt):
+        self.alt = alt
+
+    def Mask(self, data, transform):
+        return data.alt >= self.alt
+
+
+class Max_Alt(Constraint):
+    """
+    No more than alt degrees above the horizon (eg the mount can't keep up
+    near the zenith).
+    """
+
+    def __init__(self, alt):
+        self.alt = alt
+
+    def Mask(self, data, transform):
+        return data.alt <= self.alt
+
+
+class Az_Sector(Constraint):
+    """
+    Azimuth between start and stop degrees, going clockwise from start (so
+    Az_Sector(270, 90) is the northern half of the sky).
+    """
+
+    def __init__(self, start, stop):
+        self.start = start
+        self.stop = stop
+
+    def Mask(self, data, transform):
+        width = (self.stop - self.start) % 360
+        return (data.az - self.start) % 360 <= width
+
+
+class Max_Range(Constraint):
+    """
+    No further away than distance km. Needs Calculate_Passes(ranges=True).
+    """
+
+    def __init__(self, distance):
+        self.distance = distance
+
+    def Mask(self, data, transform):
+        if data.distance is None:
+            raise ValueError("Max_Range needs ranges, use Calculate_Passes(ranges=True)")
+        return data.distance <= self.distance
+
+
+class Sunlit(Constraint):
+    """
+    Out of the earth's shadow. Needs Calculate_Passes(sunlit=True).
+    """
+
+    def Mask(self, data, transform):
+        if data.sunlit is None:
+            raise ValueError("Sunlit needs shadows, use Calculate_Passes(sunlit=True)")
+        return data.sunlit
+
+
+class Min_Duration(Constraint):
+    """
+    Only the stretches where the satellite stays above alt degrees for at
+    least duration seconds (time between the first and last time stamps of
+    the stretch).
+    """
+
+    def __init__(self, duration, alt=0):
+        self.duration = duration
+        self.alt = alt
+
+    def Mask(self, data, transform):
+        above = data.alt > self.alt
+        if above.shape[1] < 2:
+            return above if self.duration <= 0 else np.zeros_like(above)
+        step = (data.utc_Times[1] - data.utc_Times[0]).sec
+
+        # Rising and falling edges of each run (like
+        # LD_PassFinder.Find_Segments), ends are inclusive.
+        padded = np.zeros((above.shape[0], above.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = above
+        edges = np.diff(padded, axis=1)
+        rows, starts = np.nonzero(edges == 1)
+        _, ends = np.nonzero(edges == -1)
+        ends -= 1
+        long_Enough = (ends - starts) * step >= self.duration
+
+        # Paint the runs that are long enough back in: +1 at the start of
+        # each, -1 after the end, and a running total.
+        paint = np.zeros(edges.shape, dtype=np.int32)
+        np.add.at(paint, (rows[long_Enough], starts[long_Enough]), 1)
+        np.add.at(paint, (rows[long_Enough], ends[long_Enough] + 1), -1)
+        return np.cumsum(paint[:, :-1], axis=1) > 0
+
+
+class Body_Separation(Constraint):
+    """
+    At least angle degrees away from a solar system body ("sun", "moon") on
+    the sky, eg to keep the telescope from pointing near the Sun.
+    """
+
+    def __init__(self, body, angle):
+        self.body = body
+        self.angle = angle
+
+    def Mask(self, data, transform):
+        body_Alt, body_Az, _ = transform.Body_AltAz(self.body)
+        alt = np.radians(data.alt)
+        body_Alt = np.radians(body_Alt)
+        cos_Separation = (np.sin(alt) * np.sin(body_Alt)
+                          + np.cos(alt) * np.cos(body_Alt) * np.cos(np.radians(data.az - body_Az)))
+        return cos_Separation <= np.cos(np.radians(self.angle))
+
+
+def Combine(constraints):
+    """
+    A single constraint from a constraint, a list of them (all of which
+    must be satisfied) or None (always satisfied).
+    """
+
+    if constraints is None:
+        return All()
+    if isinstance(constraints, Constraint):
+        return constraints
+    return All(*constraints)
@@ -1,6 +1,8 @@
 import datetime
 import logging
 
+import LD_TLECatalog
+
 log = logging.getLogger(__name__)
 
 def _To_CS(c):
@@ -28,9 +30,16 @@ def Calc_Checksum(line):
 
 class LD_MyTLE:
     """
-    Container to make accessing elements of a TLE easier.
+    Container to make accessing elements of a TLE easier. This is a view of
+    one row of an LD_TLECatalog, which does all the parsing.
+
+    There can be tens of thousands of these, so no __dict__, just the
+    catalog and the row number. The elements come from the catalog's columns
+    of plain python values, so getting one is a list lookup.
     """
 
+    __slots__ = ("catalog", "row")
+
     def __init__(self, tle):
         """
         Make the TLE. Try to accept a range of different input formats.
@@ -38,9 +47,9 @@ class LD_MyTLE:
         list, tuple: Of length 3, with a TLE line string per element.
         dict: With keys "line0", "line1", "line2". Values are the TLE line strings
 
-        If the input is not a dict, it is converted into a dict. This is to
-        most seamlessly support the LD_Planewave telescope mount interface
-        which likes dicts.
+        The TLE is parsed into a catalog of one, and checked (that the columns
+        that should be blank are, the checksums match etc). AssertionError if
+        it isn't a valid TLE.
         """
 
 #        log.debug("Creating new TLE object from {type(tle)}:")
@@ -51,43 +60,45 @@ class LD_MyTLE:
         # falls through to this one too!
         if isinstance(tle, (list, tuple)):
             assert len(tle) == 3
-            self.tle_Dict = {
-                "line0": tle[0],
-                "line1": tle[1],
-                "line2": tle[2]
-                }
+            lines = tle
         elif isinstance(tle, dict):
-            self.tle_Dict = tle
+            lines = (tle["line0"], tle["line1"], tle["line2"])
 
-        # Check the TLE lines are well formed. In this case by ensuring that
-        # the column numbers that are guaranteed to be blank are in fact blank.
-        blanks_Line1 = [1, 8, 17, 32, 43, 52, 61, 63]
-        blanks_Line2 = [1, 7, 16, 25, 33, 42, 51]
-        for b in blanks_Line1:
-            assert self.tle_Dict["line1"][b] == " "
-        for b in blanks_Line2:
-            assert self.tle_Dict["line2"][b] == " "
+        self.catalog = LD_TLECatalog.LD_TLECatalog(*([x] for x in lines))
+        self.row = 0
 
-        # Ensure line 1 starts with a "1" and line 2 a "2"
-        assert self.tle_Dict["line1"][0] == "1"
-        assert self.tle_Dict["line2"][0] == "2"
+        problems = self.catalog.problems[0]
+        assert problems == 0, LD_TLECatalog.Problem_Text(problems)
 
-        # Wikipedia says ephemeris type is always 0 so let's test that.
-        assert self.ephemeris_type == 0
+    @classmethod
+    def From_Catalog(cls, catalog, row):
+        """
+        View of row of an LD_TLECatalog (which has already been checked, so
+        this is quick).
+        """
 
-        # Catalog number is in both lines so might as well make sure they match
-        assert int(self.tle_Dict["line2"][2:7]) == self.catalog_Number
+        tle = cls.__new__(cls)
+        tle.catalog = catalog
+        tle.row = row
+        return tle
 
-        self.checksum_1 = self.tle_Dict["line1"][68]
-        my_checksum_1 = Calc_Checksum(self.tle_Dict["line1"])
-        # Ensure the checksum value in the line matches the calculated checksum
-        assert int(self.checksum_1) == my_checksum_1
+    def _Element(self, name):
+        """
+        Get an element as a plain python value (strings for the text ones).
+        """
 
-        self.checksum_2 = self.tle_Dict["line2"][68]
-        my_checksum_2 = Calc_Checksum(self.tle_Dict["line2"])
-        # Ensure the checksum value in the line matches the calculated checksum
-        assert int(self.checksum_2) == my_checksum_2
+        try:
+            return self.catalog.columns[name][self.row]
+        except KeyError:
+            return self.catalog.Column(name)[self.row]
 
+    @property
+    def tle_Dict(self):
+        return {
+            "line0": self.catalog.line0[self.row],
+            "line1": self.catalog.line1[self.row],
+            "line2": self.catalog.line2[self.row]
+            }
 
     @property
     def Dict(self):
@@ -101,14 +112,15 @@ class LD_MyTLE:
         """
         Returns the TLE elements as a list.
         """
-        return list(self.tle_Dict.values())
+        return [self.catalog.line0[self.row], self.catalog.line1[self.row],
+                self.catalog.line2[self.row]]
 
     @property
     def String(self):
         """
         Returns the TLE elements as a string
         """
-        return "\n".join(list(self.tle_Dict.values()))
+        return "\n".join(self.List)
 
     def __str__(self):
         """
@@ -120,89 +132,90 @@ class LD_MyTLE:
         """
         Allows direct access to the TLE lines.
         """
-        return list(self.tle_Dict.values())[i]
+
+        if isinstance(i, slice):
+            return self.List[i]
+        return self.catalog.lines[i][self.row]
+
+    @property
+    def checksum_1(self):
+        return str(self._Element("checksum_1"))
+
+    @property
+    def checksum_2(self):
+        return str(self._Element("checksum_2"))
 
     @property
     def name(self):
-        return self.tle_Dict["line0"]
+        return self.catalog.line0[self.row]
 
     @property
     def catalog_Number(self):
-        return int(self.tle_Dict["line1"][2:7])
+        return self._Element("catalog_Number")
 
     @property
     def classification(self):
-        return self.tle_Dict["line1"][7]
+        return self._Element("classification")
 
     @property
     def designator(self):
-        des = self.tle_Dict["line1"][9:17]
-        launch_year = int(des[0:2])
-        launch_num = int(des[2:5])
-        inter_des = des[5:7].strip()
+        launch_year = self._Element("launch_year")
+        launch_num = self._Element("launch_num")
+        inter_des = self._Element("inter_des")
         return launch_year, launch_num, inter_des
 
     @property
     def epoch(self):
-        self.epoch_str = self.tle_Dict["line1"][18:32]
         # Translate epoch straight into something actually useful!
-        epoch_year = datetime.datetime(2000 + int(self.epoch_str[:2]), 1, 1)
-        epoch_days = datetime.timedelta(days=float(self.epoch_str[2:]))
+        epoch_year = datetime.datetime(2000 + self._Element("epoch_year"), 1, 1)
+        epoch_days = datetime.timedelta(days=self._Element("epoch_days"))
         epoch = epoch_year + epoch_days
         return epoch
 
     @property
     def first_derivative(self):
-        return float(self.tle_Dict["line1"][33:43])
+        return self._Element("first_derivative")
 
     @property
     def second_derivative(self):
-        line = self.tle_Dict["line1"][44:52]
-        decimal, power = line.split("-")
-        value = float("0." + decimal.strip()) * 10**-int(power)
-        return value
+        return self._Element("second_derivative")
 
     @property
     def drag_term(self):
-        line = self.tle_Dict["line1"][53:61]
-        decimal, power = line.split("-")
-        value = float("0." + decimal.strip()) * 10**-int(power)
-        return value
+        return self._Element("drag_term")
 
     @property
     def ephemeris_type(self):
-        return int(self.tle_Dict["line1"][62])
+        return self._Element("ephemeris_type")
 
     @property
     def set_number(self):
-        return int(self.tle_Dict["line1"][64:68])
+        return self._Element("set_number")
 
     @property
     def inclination(self):
-        return float(self.tle_Dict["line2"][8:16])
+        return self._Element("inclination")
 
     @property
     def raan(self):
-        return float(self.tle_Dict["line2"][17:25])
+        return self._Element("raan")
 
     @property
     def eccentricity(self):
-        line = self.tle_Dict["line2"][26:33]
-        value = float("0."+line.strip())
-        return value
+        return self._Element("eccentricity")
 
     @property
     def perigree(self):
-        return float(self.tle_Dict["line2"][34:42])
+        return self._Element("perigree")
 
     @property
     def mean_anomaly(self):
-        return float(self.tle_Dict["line2"][43:51])
+        return self._Element("mean_anomaly")
 
     @property
     def mean_motion(self):
-        return float(self.tle_Dict["line2"][52:63])
+        return self._Element("mean_motion")
 
     @property
     def revolution_number(self):
-        return int(self.tle_Dict["line2"][63:68])
+        return self._Element("revolution_number")
@@ -12,8 +12,12 @@ Usage:
     - Use the alt/az vs time data sets for each TLE to choose which to track
 """
 
+import collections
+import concurrent.futures
 import datetime
+import functools
 import logging
+import multiprocessing.shared_memory
 import sys
 
 import astropy
@@ -25,17 +29,266 @@ import matplotlib.pyplot as plt
 import numpy as np
 import os
 import pandas as pd
-import scipy.signal
+import scipy.optimize
 import sgp4.api
 import tzlocal
 
+import LD_AltAzData
+import LD_Cache
+import LD_Constraints
 import LD_MyTLE
+import LD_Shadow
 import LD_TLEList
+import LD_Transform
 
 mpl_logger = logging.getLogger("matplotlib")
 mpl_logger.setLevel(logging.WARNING)
 log = logging.getLogger(__name__)
 
+# Earth's gravitational parameter (km^3/s^2), as used by SGP4 (WGS72).
+EARTH_MU = 398600.8
+
+# Worst pointing error (degrees) allowed from interpolating between the
+# propagated time stamps of slow moving satellites (see Sample_Strides).
+ADAPTIVE_MAX_ERROR = 0.01
+# Never leave more than this many seconds between propagated time stamps.
+ADAPTIVE_MAX_GAP = 3600
+
+def Max_Elevation(inclination, eccentricity, mean_motion, site_Position):
+    """
+    The highest elevation (degrees) that satellites with these orbital
+    elements could *ever* reach as seen from a site (ITRS position in km).
+    Arrays of elements can be passed to do lots of satellites at once.
+
+    The closest a satellite gets to being overhead is when its ground track
+    is at its most northerly/southerly, which is the orbit's inclination. If
+    that's less than the site's latitude it can never be directly overhead,
+    and the best it can do is at apogee at that closest point. This is an
+    upper bound (so safe for throwing satellites away), not a prediction.
+    """
+
+    inclination = np.radians(np.asarray(inclination, dtype=float))
+    # Retrograde orbits reach the same latitudes as their prograde mirror.
+    max_Latitude = np.minimum(inclination, np.pi - inclination)
+
+    # Semi-major axis from the mean motion (rev/day) and then apogee.
+    n = np.asarray(mean_motion, dtype=float) * 2 * np.pi / 86400
+    with np.errstate(divide="ignore"):
+        semi_Major = (EARTH_MU / n**2) ** (1 / 3)
+    apogee = semi_Major * (1 + np.asarray(eccentricity, dtype=float))
+
+    site_Radius = np.linalg.norm(site_Position)
+    site_Latitude = np.arcsin(site_Position[2] / site_Radius)
+
+    # Smallest angle (at the centre of the earth) between the site and the
+    # satellite, and the elevation the satellite would be at from there.
+    angle = np.maximum(np.abs(site_Latitude) - max_Latitude, 0)
+    up = apogee * np.cos(angle) - site_Radius
+    distance = np.sqrt(apogee**2 + site_Radius**2 - 2 * apogee * site_Radius * np.cos(angle))
+    return np.degrees(np.arcsin(np.clip(up / distance, -1, 1)))
+
+def Sample_Strides(inclination, eccentricity, mean_motion, site_Position, step,
+                   max_Error=ADAPTIVE_MAX_ERROR, max_Gap=ADAPTIVE_MAX_GAP):
+    """
+    How many time stamps (of step seconds) apart each satellite can be
+    propagated, with the positions in between linearly interpolated, while
+    keeping the error in alt/az below max_Error degrees. Arrays of elements
+    can be passed to do lots of satellites at once.
+
+    Linearly interpolating over a gap of h seconds is off by at most
+    a * h^2 / 8, where a is the biggest acceleration of the satellite in the
+    (rotating) ITRS frame: what's left of gravity after the centrifugal bit,
+    plus the Coriolis bit from its speed relative to the ground. That error
+    is then seen from as close as the satellite ever gets (overhead at
+    perigee). So LEO ends up at (or near) every time stamp and GEO (which
+    hardly moves relative to the ground) at very few.
+    """
+
+    omega = LD_Transform.EARTH_ROTATION
+    inclination = np.radians(np.asarray(inclination, dtype=float))
+    eccentricity = np.asarray(eccentricity, dtype=float)
+    n = np.asarray(mean_motion, dtype=float) * 2 * np.pi / 86400
+    with np.errstate(divide="ignore"):
+        semi_Major = (EARTH_MU / n**2) ** (1 / 3)
+    perigee = semi_Major * (1 - eccentricity)
+    apogee = semi_Major * (1 + eccentricity)
+
+    # Angular speed at perigee relative to the rotating earth, and the
+    # fastest it can then move over the ground (plus climbing/falling).
+    n_Perigee = n * (1 + eccentricity)**2 / (1 - eccentricity**2)**1.5
+    rate = np.sqrt(n_Perigee**2 + omega**2 - 2 * n_Perigee * omega * np.cos(inclination))
+    radial = eccentricity * np.sqrt(EARTH_MU / (semi_Major * (1 - eccentricity**2)))
+    speed = rate * apogee + radial
+
+    # Gravity minus centrifugal, worst of perigee/apogee, plus the vertical
+    # part of gravity that isn't cancelled when away from the equator.
+    gravity = EARTH_MU / perigee**2
+    residual = np.maximum(np.abs(gravity - omega**2 * perigee),
+                          np.abs(EARTH_MU / apogee**2 - omega**2 * apogee))
+    max_Latitude = np.minimum(inclination, np.pi - inclination)
+    acceleration = residual + gravity * np.sin(max_Latitude) + 2 * omega * speed
+
+    closest = np.maximum(perigee - np.linalg.norm(site_Position), 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gap = np.sqrt(8 * np.radians(max_Error) * closest / acceleration)
+        stride = np.floor(gap / step)
+    max_Stride = max(int(max_Gap // step), 1)
+    return np.clip(np.nan_to_num(stride, nan=1, posinf=max_Stride), 1, max_Stride).astype(int)
+
+def Strided_ITRS(satrecs, strides, jd_Range, fr_Range, matrices):
+    """
+    Propagate each satellite (sgp4 Satrec) at every strides[i]'th time stamp
+    (and the last one), rotate into ITRS with matrices (one per time stamp)
+    and linearly interpolate back onto every time stamp. Satellites with the
+    same stride are done together in one SatrecArray.
+
+    Returns the error codes (n_sats x n_times) and ITRS positions (n_sats x
+    n_times x 3) in km.
+    """
+
+    n_Times = len(jd_Range)
+    strides = np.asarray(strides)
+    errors = np.zeros((len(satrecs), n_Times), dtype=np.uint8)
+    p_ITRS = np.zeros((len(satrecs), n_Times, 3))
+    for stride in np.unique(strides):
+        rows = np.flatnonzero(strides == stride)
+        columns = np.arange(0, n_Times, stride)
+        if columns[-1] != n_Times - 1:
+            columns = np.append(columns, n_Times - 1)
+
+        sat_Array = sgp4.api.SatrecArray([satrecs[i] for i in rows])
+        e, p, _ = sat_Array.sgp4(jd_Range[columns], fr_Range[columns])
+        p = LD_Transform.Rotate(matrices[columns], p)
+        if len(columns) == n_Times:
+            errors[rows] = e
+            p_ITRS[rows] = p
+            continue
+
+        # Which pair of propagated time stamps each time stamp falls between
+        # and how far along.
+        index = np.arange(n_Times)
+        left = np.clip(np.searchsorted(columns, index, side="right") - 1, 0, len(columns) - 2)
+        weight = ((index - columns[left]) / (columns[left + 1] - columns[left]))[:, None]
+        p_ITRS[rows] = p[:, left] * (1 - weight) + p[:, left + 1] * weight
+        errors[rows] = np.maximum(e[:, left], e[:, left + 1])
+
+    return errors, p_ITRS
+
+def Find_Segments(mask):
+    """
+    Find the runs of True in each row of a (n_sats x n_times) boolean array
+    (eg alt > 0, for when each satellite is above the horizon).
+
+    Returns arrays of the row, first index and last index (inclusive) of
+    every run, sorted by row then time.
+    """
+
+    n_Times = mask.shape[1]
+    # Pad each row with False so runs touching the ends still have a rising
+    # and falling edge.
+    padded = np.zeros((mask.shape[0], n_Times + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+
+    # nonzero goes row by row so the rising and falling edges pair up.
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return rows, starts, ends - 1
+
+def Segment_Peaks(values, rows, starts, ends):
+    """
+    Index (along the time axis) of the largest value in each of the segments
+    from Find_Segments.
+    """
+
+    if len(rows) == 0:
+        return np.array([], dtype=int)
+
+    # Line up every sample of every segment end to end.
+    lengths = ends - starts + 1
+    offsets = np.cumsum(lengths) - lengths
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    columns = np.arange(lengths.sum()) - offsets[owner] + starts[owner]
+    samples = values[rows[owner], columns]
+
+    # Sort by segment then by descending value, the first of each segment
+    # is then its peak.
+    order = np.lexsort((-samples, owner))
+    return columns[order[offsets]]
+
+def _Share(shape, dtype, data=None):
+    """
+    Make a numpy array backed by shared memory (so worker processes can read
+    and write it without pickling). Returns the SharedMemory and the array,
+    plus a (name, shape, dtype) spec to pass to the workers.
+    """
+
+    dtype = np.dtype(dtype)
+    size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+    shm = multiprocessing.shared_memory.SharedMemory(create=True, size=size)
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    if data is not None:
+        array[:] = data
+    return shm, array, (shm.name, shape, dtype.str)
+
+def _Attach(spec):
+    """
+    Worker side of _Share, get the array from its spec.
+    """
+
+    name, shape, dtype = spec
+    shm = multiprocessing.shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def _AltAz_Worker(lines, first, jd_Spec, fr_Spec, matrix_Spec, site_Position, site_Basis,
+                  error_Spec, alt_Spec, az_Spec, range_Spec=None, strides=None):
+    """
+    Runs in a worker process. Propagate a shard of the TLE list (lines is a
+    list of (line1, line2)) and write alt/az (and range, if range_Spec is
+    given) and SGP4 error codes into the shared arrays, starting at row
+    "first". If strides is given, see Strided_ITRS.
+    """
+
+    shms = []
+    try:
+        views = []
+        for spec in [jd_Spec, fr_Spec, matrix_Spec, error_Spec, alt_Spec, az_Spec, range_Spec]:
+            if spec is None:
+                views.append(None)
+                continue
+            shm, view = _Attach(spec)
+            shms.append(shm)
+            views.append(view)
+        jd_Range, fr_Range, matrices, errors, alt, az, distance = views
+
+        satrecs = [sgp4.api.Satrec.twoline2rv(line1, line2) for line1, line2 in lines]
+        if strides is None:
+            strides = np.ones(len(satrecs), dtype=int)
+        e, p_ITRS = Strided_ITRS(satrecs, strides, jd_Range, fr_Range, matrices)
+        shard_Alt, shard_Az, shard_Range = LD_Transform.Topocentric(
+            site_Position, site_Basis, p_ITRS)
+
+        last = first + len(lines)
+        errors[first:last] = e
+        alt[first:last] = shard_Alt
+        az[first:last] = shard_Az
+        if distance is not None:
+            distance[first:last] = shard_Range
+    finally:
+        for shm in shms:
+            shm.close()
+
+def _Stream_Track(sat, utc_Times, location):
+    """
+    LD_AltAzData of one satellite (an LD_MyTLE) at the time stamps of one of
+    Stream_Passes' passes, made when the pass data is looked at.
+    """
+
+    satrec = sgp4.api.Satrec.twoline2rv(sat[1], sat[2])
+    _, p, _ = satrec.sgp4_array(utc_Times.jd1, utc_Times.jd2)
+    alt, az, _ = LD_Transform.LD_Transform(utc_Times, location).TEME_To_AltAz(p[None])
+    return LD_AltAzData.LD_AltAzData([sat], utc_Times, alt, az)
+
 class LD_PassFinder:
     """
     Calculates passes of satelites.
@@ -44,11 +297,79 @@ class LD_PassFinder:
         log.debug("Set passfinder defaults")
         self.here = None
         self.tle_List = None
+        self.transform = None
+        self.frame_Cache = None
+        self.track_Cache = None
+        # Track cache keys of the satellites in the last _Calculate_AltAz.
+        self.track_Keys = None
+
+        # Calculate_Passes runs in this process unless told otherwise by
+        # Set_Workers.
+        self.workers = 1
+        self.pool = None
+
+        # Satrecs of the last list of TLEs Whats_Up was asked about.
+        self.quick_Sats = []
+        self.quick_Satrecs = []
+        self.quick_Array = None
+
+        # Several sites at once, see Set_Sites.
+        self.sites = {}
+        self.site_Data = {}
+        self.site_Passes = {}
 
         # Knowing timezone seems to be useful a lot of the time so let's put
         # it in the constructor.
         self.my_tz = tzlocal.get_localzone()
 
+    def Set_Workers(self, workers=None):
+        """
+        Set the number of worker processes Calculate_Passes shares the TLE
+        list between. 1 means do it all in this process, None means use
+        every CPU.
+        """
+
+        if workers is None:
+            workers = os.cpu_count()
+        log.info(f"Using {workers} worker processes for calculating passes")
+
+        # Any old pool is the wrong size now.
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        self.workers = workers
+        return self.workers
+
+    def Set_Frame_Cache(self, path="cache/frames", max_MB=200):
+        """
+        Keep the frame rotations for each time range/site on disk (see
+        LD_Cache) so running the same time range again skips all the earth
+        orientation maths. Pass path=None to turn it off.
+        """
+
+        if path is None:
+            self.frame_Cache = None
+        else:
+            self.frame_Cache = LD_Cache.LD_Cache(path, max_MB)
+        return self.frame_Cache
+
+    def Set_Track_Cache(self, path="cache/tracks", max_MB=500):
+        """
+        Keep each satellite's alt/az track on disk, keyed by its TLE lines, the
+        site and the time stamps, so Calculate_Passes only has to propagate
+        satellites it hasn't seen before (or whose TLE has been updated).
+        The tracks for one site and set of time stamps are stored together,
+        see _Load_Tracks. Filter_Passes keeps the passes it finds in there
+        too, so filtering the same tracks again doesn't redo the work. Pass
+        path=None to turn it off.
+        """
+
+        if path is None:
+            self.track_Cache = None
+        else:
+            self.track_Cache = LD_Cache.LD_Cache(path, max_MB)
+        return self.track_Cache
+
     def Set_Position(self, lat, long, height):
         """
         Set the latitude, longitude and height above sea level of the OGS
@@ -59,6 +380,9 @@ class LD_PassFinder:
         self.here = astropy.coordinates.EarthLocation(lat=lat,
                                                       lon=long,
                                                       height=height * astropy.units.m)
+        # Moving the site doesn't change the time dependent frame rotations.
+        if self.transform is not None:
+            self.transform.Set_Site(self.here)
         return self.here
 
     def Search_Time_Range(self, t_start, t_stop, t_step):
@@ -79,23 +403,21 @@ class LD_PassFinder:
         self.t_step = datetime.timedelta(minutes=t_step)
 
         log.info(f"Set time range start={self.t_start} UTC, stop={self.t_stop} UTC, step={self.t_step}")
-
-        # Make all the time stamps that we want data for.
-        # I'm sure there's a more elegant way of doing this but it works.
-        self.utc_Time_Series = []
-        ti = self.t_start
-        while ti <= self.t_stop:
-            self.utc_Time_Series.append(ti)
-            ti = ti + self.t_step
-
-        # sgp4 takes time stamps as julian date (because of course) and also as
-        # numpy arrays so do the relevant conversions.
-        self.jd_Range = np.array([x.jd for x in self.utc_Time_Series])
-
-        # astropy still wants the time stamps in utc_Time_Series, which map to
-        # (slicable?) the ones in jd_Range. But should they actually both be in
-        # one container to ensure they are definitely referring to the same
-        # times?
+        # New time stamps need new frame rotations.
+        self.transform = None
+
+        # Make all the time stamps that we want data for (including t_stop if
+        # it lands exactly on a step) as one astropy Time array.
+        step_Seconds = self.t_step.total_seconds()
+        n_Steps = int(np.floor((self.t_stop - self.t_start).sec / step_Seconds + 1e-9)) + 1
+        offsets = astropy.time.TimeDelta(np.arange(max(n_Steps, 0)) * step_Seconds, format="sec")
+        self.utc_Time_Series = self.t_start + offsets
+
+        # sgp4 takes time stamps as julian date (because of course). Keep the
+        # two parts astropy stores them as separately (whole days and the
+        # fraction) so small steps aren't lost in the rounding.
+        self.jd_Range = self.utc_Time_Series.jd1
+        self.fr_Range = self.utc_Time_Series.jd2
 
         return self.utc_Time_Series
 
@@ -126,11 +448,8 @@ class LD_PassFinder:
         time zone.
         """
 
-        # Sorry, this is kind of horrible.
-        # Converts each astropy time object into a utc datetime object, then
-        # converts into the local time zone.
-        local_Times = [t.to_datetime(self.my_tz) for t in self.utc_Time_Series]
-        return local_Times
+        local_Times = self.utc_Time_Series.to_datetime(self.my_tz)
+        return list(local_Times)
 
     def Load_TLE_Data(self, tle_List=None):
         """
@@ -168,71 +487,711 @@ class LD_PassFinder:
             log.debug(f"Search result {result}")
         return result
 
-    def Calculate_Passes(self, satellites=None):
+    def _Propagate(self, sats, batch=True, columns=slice(None)):
         """
-        Pass either a single LD_MyTLE object, or a list of them.
-        Or leave empty to do ALL of the satellites in the TLE List that was
-        loaded by Load_TLE_Data.
+        Run SGP4 for every satellite in sats at every time stamp in jd_Range
+        (+ fr_Range), or just the ones picked out by columns.
+        If batch is True this is a single call using sgp4's SatrecArray
+        (rather than one sgp4_array call per satellite).
+
+        Returns the error codes (n_sats x n_times) and the TEME positions and
+        velocities (n_sats x n_times x 3) in km and km/s.
+        """
+
+        jd_Range = self.jd_Range[columns]
+        fr_Range = self.fr_Range[columns]
+        if not batch:
+            log.debug(f"Propagating {len(sats)} TLEs one at a time")
+            results = [sgp4.api.Satrec.twoline2rv(tle[1], tle[2]).sgp4_array(
+                           jd_Range, fr_Range)
+                       for tle in sats]
+            return tuple(np.array(x) for x in zip(*results))
+
+        log.debug(f"Batch propagating {len(sats)} TLEs over {len(jd_Range)} time stamps")
+        sat_Array = sgp4.api.SatrecArray(
+            [sgp4.api.Satrec.twoline2rv(tle[1], tle[2]) for tle in sats]
+            )
+        return sat_Array.sgp4(jd_Range, fr_Range)
+
+    def _Parallel_AltAz(self, sats, ranges=False, strides=None):
+        """
+        Same as _Propagate + LD_Transform but with the TLE list split between
+        a pool of worker processes. The results are written straight into
+        shared memory arrays so nothing big has to be pickled. strides are
+        passed on to Strided_ITRS.
+
+        Returns the error codes, alt, az and range (all n_sats x n_times, range
+        is None unless asked for).
+        """
+
+        # The pool is kept between calls since starting the processes isn't
+        # free.
+        if self.pool is None:
+            self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+
+        transform = self._Get_Transform()
+        shape = (len(sats), len(self.jd_Range))
+        shared = [
+            _Share(self.jd_Range.shape, np.float64, self.jd_Range),
+            _Share(self.fr_Range.shape, np.float64, self.fr_Range),
+            _Share(transform.teme_To_ITRS.shape, np.float64, transform.teme_To_ITRS),
+            _Share(shape, np.uint8),
+            _Share(shape, np.float64),
+            _Share(shape, np.float64)
+            ]
+        if ranges:
+            shared.append(_Share(shape, np.float64))
+        jd_Spec, fr_Spec, matrix_Spec, error_Spec, alt_Spec, az_Spec = [x[2] for x in shared[:6]]
+        range_Spec = shared[6][2] if ranges else None
+
+        try:
+            # A few shards per worker evens out the load a bit.
+            n_Shards = min(len(sats), self.workers * 4)
+            bounds = np.linspace(0, len(sats), n_Shards + 1).astype(int)
+            log.debug(f"Sharing {len(sats)} TLEs between {self.workers} workers in {n_Shards} shards")
+            futures = [
+                self.pool.submit(_AltAz_Worker,
+                                 [(tle[1], tle[2]) for tle in sats[first:last]],
+                                 first, jd_Spec, fr_Spec, matrix_Spec,
+                                 transform.site_Position, transform.site_Basis,
+                                 error_Spec, alt_Spec, az_Spec, range_Spec,
+                                 None if strides is None else strides[first:last])
+                for first, last in zip(bounds[:-1], bounds[1:])
+                ]
+            for future in concurrent.futures.as_completed(futures):
+                # Re-raises anything that went wrong in a worker.
+                future.result()
+
+            results = [np.array(x[1]) for x in shared[3:]]
+            if not ranges:
+                results.append(None)
+        finally:
+            for shm, _, _ in shared:
+                shm.close()
+                shm.unlink()
+
+        return tuple(results)
+
+    def _Get_Transform(self):
+        """
+        The TEME -> ITRS rotations only depend on the time stamps (and the
+        observer basis only on the site) so make them once and reuse them
+        until Search_Time_Range is called again.
+        """
+
+        if self.transform is None:
+            self.transform = self._Make_Transform(self.utc_Time_Series)
+        return self.transform
+
+    def Propagate(self, satellites=None):
+        """
+        Just the SGP4 step of Calculate_Passes: every satellite (see
+        Calculate_Passes for what satellites can be) at every time stamp.
+
+        Returns the error codes (n_sats x n_times) and the TEME positions and
+        velocities (n_sats x n_times x 3) in km and km/s.
+        """
+
+        return self._Propagate(self._Get_Satellites(satellites))
+
+    def Transform_Positions(self, p, reuse=True):
+        """
+        Just the frame transform step of Calculate_Passes: TEME positions
+        (from Propagate) to alt, az and range from the current site. If
+        reuse is False the frame rotations are made again (or loaded from the
+        frame cache if there is one) rather than using the ones kept since
+        Search_Time_Range, and the new ones aren't kept.
+        """
+
+        transform = self._Get_Transform() if reuse else self._Make_Transform(self.utc_Time_Series)
+        return transform.TEME_To_AltAz(p)
+
+    def _Frame_Key(self, utc_Times):
+        """
+        Frame cache key for some time stamps from the current site. They are
+        regularly spaced so the first one, the step and how many there are
+        identify them.
+        """
+
+        return LD_Cache.Make_Key("frames",
+                                 float(utc_Times[0].jd1), float(utc_Times[0].jd2),
+                                 self.t_step.total_seconds(), len(utc_Times),
+                                 self.here.lat.deg, self.here.lon.deg,
+                                 self.here.height.to_value(astropy.units.m))
+
+    def Get_Ephemeris(self, body):
+        """
+        Topocentric alt, az (degrees) and range (km) of the Sun, Moon (or
+        anything astropy's get_body knows) at every time stamp in the time
+        range, as a DataFrame indexed like the pass data.
+
+        Positions are calculated once per time range and kept with the frame
+        rotations (and in the frame cache, if there is one, so the same night
+        doesn't get recalculated next time either). Constraints like
+        LD_Constraints.Body_Separation use the same ones.
+        """
+
+        transform = self._Get_Transform()
+        if body not in transform.bodies:
+            transform.Body_ITRS(body)
+            if self.frame_Cache is not None:
+                self.frame_Cache.Put(self._Frame_Key(transform.utc_Times), transform.Arrays())
+
+        alt, az, distance = transform.Body_AltAz(body)
+        return pd.DataFrame({"alt": alt, "az": az, "range": distance})
+
+    def Body_RaDec(self, body="moon", when=None, interval=60):
+        """
+        Apparent topocentric RA (hours) and Dec (degrees) of a solar system
+        body now (or at "when", a local time string/datetime), and how fast
+        they're changing (arcsec/s, averaged over the next interval seconds).
+        That's what LD_Planewave.Follow_Body needs to track it.
+
+        If the time is inside the time range, the cached positions from
+        Get_Ephemeris are used, otherwise they're worked out just for then.
+        """
+
+        if when is None:
+            when = astropy.time.Time.now()
+        else:
+            when = self._Timestamp_Convert(when)
+
+        transform = None
+        if getattr(self, "utc_Time_Series", None) is not None and len(self.utc_Time_Series) > 1:
+            step = self.t_step.total_seconds()
+            index = (when - self.t_start).sec / step
+            if 0 <= index and index + interval / step <= len(self.utc_Time_Series) - 1:
+                self.Get_Ephemeris(body)
+                transform = self._Get_Transform()
+                indices = [index, index + interval / step]
+        if transform is None:
+            times = when + astropy.time.TimeDelta([0, interval], format="sec")
+            transform = LD_Transform.LD_Transform(times, self.here)
+            indices = [0, 1]
+
+        (ra, dec), (ra_Later, dec_Later) = [transform.Body_RaDec_At(body, i) for i in indices]
+
+        # TEME's RA is from the mean equinox, apparent is from the true one.
+        equinoxes = (when.sidereal_time("apparent", longitude=0)
+                     - when.sidereal_time("mean", longitude=0, model="IAU1982")).to_value(astropy.units.rad)
+        ra = (ra + equinoxes) % (2 * np.pi)
+
+        arcsec = np.degrees(1) * 3600
+        ra_Rate = ((ra_Later - ra + equinoxes + np.pi) % (2 * np.pi) - np.pi) * arcsec / interval
+        dec_Rate = (dec_Later - dec) * arcsec / interval
+        return np.degrees(ra) / 15, np.degrees(dec), ra_Rate, dec_Rate
+
+    def _Make_Transform(self, utc_Times):
+        """
+        Make an LD_Transform for some of the time stamps, from the frame
+        cache if there is one and it has them.
+        """
+
+        if self.frame_Cache is None:
+            return LD_Transform.LD_Transform(utc_Times, self.here)
+
+        key = self._Frame_Key(utc_Times)
+        arrays = self.frame_Cache.Get(key)
+        if arrays is not None:
+            log.debug("Frame rotations loaded from cache")
+            return LD_Transform.LD_Transform.From_Arrays(utc_Times, self.here, arrays)
+
+        transform = LD_Transform.LD_Transform(utc_Times, self.here)
+        self.frame_Cache.Put(key, transform.Arrays())
+        return transform
+
+    def _Reference_AltAz(self, p, v, observer):
+        """
+        The original (slow but definitely right) way of getting alt/az of one
+        satellite using astropy's frame transforms. Useful for checking the
+        accuracy of LD_Transform.
+        """
+
+        # SGP4 gives results in some weird coordinate basis (True Equator
+        # Mean Equinox frame (TEME)). Get values in the right format to
+        # convert to something more intelligible and useful.
+        teme_p = astropy.coordinates.CartesianRepresentation(p * astropy.units.km, xyz_axis=1)
+        teme_v = astropy.coordinates.CartesianDifferential(v * (astropy.units.km / astropy.units.s), xyz_axis=1)
+
+        # Put the coordinates into astropy, which can convert between bases
+        # using International Terrestrial Reference System (ITRS) coordinates.
+        teme = astropy.coordinates.TEME(teme_p.with_differentials(teme_v), obstime=self.utc_Time_Series)
+        itrs = teme.transform_to(astropy.coordinates.ITRS(obstime=self.utc_Time_Series))
+
+        # Convert satellite coordinates (relative to earth) into alt/az
+        # from this position on earth (set by Set_Position).
+        return itrs.transform_to(observer)
+
+    def _Quick_Array(self, sats):
+        """
+        SatrecArray of sats for Whats_Up, only remade when the list of TLE
+        objects changes (parsing a few thousand TLEs is most of the time
+        otherwise).
+        """
+
+        if len(sats) != len(self.quick_Sats) or any(a is not b for a, b in zip(sats, self.quick_Sats)):
+            log.debug(f"Making Satrecs of {len(sats)} TLEs for quick queries")
+            self.quick_Sats = list(sats)
+            self.quick_Satrecs = [sgp4.api.Satrec.twoline2rv(tle[1], tle[2]) for tle in sats]
+            self.quick_Array = sgp4.api.SatrecArray(self.quick_Satrecs)
+        return self.quick_Array
+
+    def Whats_Up(self, when=None, top_N=10, rank="alt", lookahead=10, step=10,
+                 satellites=None, alt_Filter=0):
+        """
+        Quick look at which satellites are above alt_Filter degrees right now
+        (or at "when", a local time string/datetime like Search_Time_Range
+        takes), without a whole Calculate_Passes run. Doesn't touch the time
+        range or results of Calculate_Passes.
+
+        The top_N are returned ranked by either:
+            - "alt": highest right now first.
+            - "remaining": longest until they drop below alt_Filter first.
+        Time remaining is found by propagating the satellites that are up
+        for the next lookahead minutes, every step seconds (so it's capped at
+        lookahead, use a long enough one).
+
+        Returns a DataFrame with the satellite name, alt, az and range now,
+        and the seconds remaining above alt_Filter.
+        """
+
+        if rank not in ("alt", "remaining"):
+            raise ValueError(f"Can't rank by {rank}, use alt or remaining")
+        sats = self._Get_Satellites(satellites)
+        if when is None:
+            when = astropy.time.Time.now()
+        else:
+            when = self._Timestamp_Convert(when)
+
+        # Everything right now first, to see what's up.
+        now = when.reshape(1)
+        e, p, _ = self._Quick_Array(sats).sgp4(now.jd1, now.jd2)
+        alt, az, distance = LD_Transform.LD_Transform(now, self.here).TEME_To_AltAz(p)
+        alt, az, distance = alt[:, 0], az[:, 0], distance[:, 0]
+        rows = np.flatnonzero((alt > alt_Filter) & (e[:, 0] == 0))
+        log.info(f"{len(rows)} satellites up at {when.iso} UTC")
+        rows = rows[np.argsort(-alt[rows], kind="stable")]
+        if rank == "alt":
+            rows = rows[:top_N]
+
+        # Then just the ones that are up (or will be shown) for the lookahead.
+        seconds = np.arange(0, lookahead * 60 + step, step)
+        utc_Times = when + astropy.time.TimeDelta(seconds, format="sec")
+        remaining = np.zeros(len(rows))
+        if len(rows) > 0:
+            sat_Array = sgp4.api.SatrecArray([self.quick_Satrecs[i] for i in rows])
+            e, p, _ = sat_Array.sgp4(utc_Times.jd1, utc_Times.jd2)
+            ahead, _, _ = LD_Transform.LD_Transform(utc_Times, self.here).TEME_To_AltAz(p)
+            # Time of the first time stamp each one is below alt_Filter (or
+            # SGP4 gave up), or the end of the lookahead if never.
+            below = (ahead <= alt_Filter) | (e != 0)
+            first_Below = np.where(np.any(below, axis=1), np.argmax(below, axis=1), len(seconds) - 1)
+            remaining = seconds[first_Below]
+
+        if rank == "remaining":
+            # Already sorted by alt, so a stable sort breaks ties by alt.
+            order = np.argsort(-remaining, kind="stable")[:top_N]
+            rows, remaining = rows[order], remaining[order]
+
+        return pd.DataFrame({
+            "satellite": [sats[i].name.rstrip() for i in rows],
+            "alt": alt[rows],
+            "az": az[rows],
+            "range": distance[rows],
+            "remaining": remaining
+            })
+
+    def _Get_Satellites(self, satellites):
+        """
+        Get the satellites argument of Calculate_Passes etc. into a list of
+        LD_MyTLE objects.
         """
 
-        # Get the input into the right form for the following
         if isinstance(satellites, LD_MyTLE.LD_MyTLE):
             #print(f"One TLE: {satellites.name}")
-            sats = [satellites,]
+            return [satellites,]
         elif isinstance(satellites, list):
             #print(f"List: {[x.name.rstrip() for x in satellites]}")
-            sats = satellites
-        else:
-            sats = list(self.tle_List)
+            return satellites
+        elif isinstance(satellites, (np.ndarray, LD_TLEList.LD_TLEList)):
+            # Slices or the whole of an LD_TLEList.
+            return list(satellites)
+        return list(self.tle_List.TLEs)
+
+    def Prefilter_Satellites(self, sats, alt_Filter, margin=1.0):
+        """
+        Throw away satellites whose orbits can never get above alt_Filter
+        degrees (minus a margin, for the difference between geocentric and
+        geodetic up and the elements drifting) from the site, without running
+        SGP4. See Max_Elevation.
+
+        Returns the satellites that might be visible. What was thrown away
+        (and why) is kept in self.pruned as [name, max elevation, reason].
+        """
+
+        self.pruned = []
+        if len(sats) == 0:
+            return sats
+
+        site_Position, _ = LD_Transform.Site_Basis(self.here)
+        max_El = Max_Elevation([tle.inclination for tle in sats],
+                               [tle.eccentricity for tle in sats],
+                               [tle.mean_motion for tle in sats],
+                               site_Position)
+        keep = max_El >= alt_Filter - margin
+
+        for i in np.flatnonzero(~keep):
+            reason = "never rises" if max_El[i] < 0 else "peaks below alt filter"
+            self.pruned.append([sats[i].name, max_El[i], reason])
+
+        reasons = collections.Counter(x[2] for x in self.pruned)
+        log.info(f"Prefilter kept {keep.sum()} of {len(sats)} TLEs, pruned {dict(reasons)}")
+        return [sats[i] for i in np.flatnonzero(keep)]
+
+    def _Incremental_AltAz(self, sats, ranges, batch=True):
+        """
+        If the last Calculate_Passes was for the same site and step, and its
+        time stamps overlap the current ones, reuse its alt/az for the
+        overlapping part and only calculate the new time stamps (and any
+        satellites that weren't in the last run, or whose TLE changed).
+
+        Returns the error codes, alt, az and range like _Parallel_AltAz, or
+        None if the last run can't be used.
+        """
+
+        old = getattr(self, "altaz_Data", None)
+        if old is None or len(old.utc_Times) < 2 or old.location is None:
+            return None
+        if ranges and old.distance is None:
+            return None
+        if not np.allclose([old.location.lat.deg, old.location.lon.deg, old.location.height.value],
+                           [self.here.lat.deg, self.here.lon.deg, self.here.height.value]):
+            return None
+
+        # Same step, and the new time stamps line up with the old ones?
+        step = self.t_step.total_seconds()
+        if abs((old.utc_Times[1] - old.utc_Times[0]).sec - step) > 1e-3:
+            return None
+        shift = (self.utc_Time_Series[0] - old.utc_Times[0]).sec / step
+        offset = int(round(shift))
+        if abs(shift - offset) > 1e-3:
+            return None
+
+        # Overlapping part, in new time stamp indices.
+        n_Times = len(self.utc_Time_Series)
+        first = max(0, -offset)
+        last = min(n_Times, len(old.utc_Times) - offset)
+        if last <= first:
+            return None
+
+        # Which satellites were in the last run, with exactly the same TLE.
+        old_Rows = {(tle[1], tle[2]): row for row, tle in enumerate(old.tles)}
+        rows = np.array([old_Rows.get((tle[1], tle[2]), -1) for tle in sats])
+        reused = np.flatnonzero(rows >= 0)
+        fresh = np.flatnonzero(rows < 0)
+        log.info(f"Reusing {last - first} of {n_Times} time stamps for {len(reused)} TLEs, "
+                 f"{len(fresh)} TLEs calculated from scratch")
+
+        shape = (len(sats), n_Times)
+        all_e = np.zeros(shape, dtype=np.uint8)
+        all_alt = np.zeros(shape)
+        all_az = np.zeros(shape)
+        all_range = np.zeros(shape) if ranges else None
+
+        def calculate(which, columns):
+            if len(which) == 0 or columns.stop <= columns.start:
+                return
+            e, p, _ = self._Propagate([sats[i] for i in which], batch, columns)
+            transform = self._Make_Transform(self.utc_Time_Series[columns])
+            alt, az, distance = transform.TEME_To_AltAz(p)
+            all_e[which, columns] = e
+            all_alt[which, columns] = alt
+            all_az[which, columns] = az
+            if ranges:
+                all_range[which, columns] = distance
+
+        # Copy over what's already known, then fill in either side of it.
+        old_Columns = slice(first + offset, last + offset)
+        all_alt[reused, first:last] = old.alt[rows[reused], old_Columns]
+        all_az[reused, first:last] = old.az[rows[reused], old_Columns]
+        if ranges:
+            all_range[reused, first:last] = old.distance[rows[reused], old_Columns]
+        calculate(reused, slice(0, first))
+        calculate(reused, slice(last, n_Times))
+        calculate(fresh, slice(0, n_Times))
+
+        return all_e, all_alt, all_az, all_range
+
+    def _Track_Settings(self, adaptive=False):
+        """
+        The parts of the track cache keys that are the same for every
+        satellite: the site, the time stamps (first one, step and how many)
+        and whether the tracks are interpolated. Made once per run, getting
+        the site's lat/long out of astropy isn't quick.
+        """
+
+        lat, lon, height = self.here.to_geodetic()
+        return (lat.deg, lon.deg, height.to_value(astropy.units.m),
+                float(self.jd_Range[0]), float(self.fr_Range[0]),
+                self.t_step.total_seconds(), len(self.jd_Range),
+                ADAPTIVE_MAX_ERROR if adaptive else None)
+
+    def _Track_Key(self, tle, settings):
+        """
+        Cache key for one satellite's track: its TLE and the _Track_Settings.
+        """
+        return LD_Cache.Make_Key("track", tle[1], tle[2], *settings)
+
+    def _Load_Tracks(self, keys, settings):
+        """
+        Get whatever tracks there are in the cache for the satellites with
+        these _Track_Keys. All the tracks for one site and set of time stamps
+        are kept in a single cache entry (one file to read rather than one per
+        satellite, which was slower than just running SGP4 again), with the
+        key of each track alongside it.
+
+        Returns the row of the cache entry for each key (-1 if it's not
+        there) and the cached arrays.
+        """
+
+        arrays = self.track_Cache.Get(LD_Cache.Make_Key("tracks", *settings))
+        if arrays is None or "range" not in arrays:
+            return np.full(len(keys), -1), None
+        rows = {key: row for row, key in enumerate(arrays["keys"].tolist())}
+        return np.array([rows.get(key, -1) for key in keys]), arrays
+
+    def _Sample_Strides(self, sats, location=None):
+        """
+        Sample_Strides for each TLE in sats at the current time step, as seen
+        from location (default the current site).
+        """
+
+        position, _ = LD_Transform.Site_Basis(self.here if location is None else location)
+        strides = Sample_Strides([tle.inclination for tle in sats],
+                                 [tle.eccentricity for tle in sats],
+                                 [tle.mean_motion for tle in sats],
+                                 position, self.t_step.total_seconds())
+        n_Times = len(self.jd_Range)
+        samples = sum(len(range(0, n_Times, x)) for x in strides)
+        log.info(f"Adaptive steps: propagating {samples} of {len(sats) * n_Times} satellite time stamps")
+        return strides
+
+    def _Calculate_AltAz(self, sats, batch, ranges, incremental, adaptive=False):
+        """
+        Get the error codes, alt, az and range (all n_sats x n_times, range is
+        None unless asked for) by whatever is quickest: the track cache, the
+        last run (if incremental), worker processes, or just in this process.
+        If adaptive, slow satellites are propagated at fewer time stamps (see
+        Sample_Strides).
+        """
 
+        # Tracks in the cache always have their range, so they're there
+        # whether the next run wants it or not.
+        wanted_Range = ranges
+        ranges = ranges or self.track_Cache is not None
+        self.track_Keys = None
+        shape = (len(sats), len(self.utc_Time_Series))
+        all_e = np.zeros(shape, dtype=np.uint8)
+        all_alt = np.zeros(shape)
+        all_az = np.zeros(shape)
+        all_range = np.zeros(shape) if ranges else None
+        if len(sats) == 0:
+            return all_e, all_alt, all_az, all_range if wanted_Range else None
+
+        # Anything with a track in the cache doesn't need doing again.
+        to_Do = np.arange(len(sats))
+        if self.track_Cache is not None:
+            settings = self._Track_Settings(adaptive)
+            keys = [self._Track_Key(tle, settings) for tle in sats]
+            self.track_Keys = keys
+            rows, cached = self._Load_Tracks(keys, settings)
+            hits = rows >= 0
+            if hits.any():
+                all_alt[hits] = cached["alt"][rows[hits]]
+                all_az[hits] = cached["az"][rows[hits]]
+                all_range[hits] = cached["range"][rows[hits]]
+            to_Do = np.flatnonzero(~hits)
+            log.info(f"{hits.sum()} of {len(sats)} tracks loaded from cache")
+
+        if len(to_Do) == 0:
+            return all_e, all_alt, all_az, all_range if wanted_Range else None
+
+        to_Do_Sats = [sats[i] for i in to_Do]
+        result = None
+        if incremental:
+            # Only asks for range if the caller did, the last run might not
+            # have kept it.
+            result = self._Incremental_AltAz(to_Do_Sats, wanted_Range, batch)
+        if result is None:
+            strides = self._Sample_Strides(to_Do_Sats) if adaptive else None
+            if self.workers > 1:
+                result = self._Parallel_AltAz(to_Do_Sats, ranges, strides)
+            elif adaptive:
+                transform = self._Get_Transform()
+                e, p_ITRS = Strided_ITRS(
+                    [sgp4.api.Satrec.twoline2rv(tle[1], tle[2]) for tle in to_Do_Sats],
+                    strides, self.jd_Range, self.fr_Range, transform.teme_To_ITRS)
+                result = (e,) + transform.ITRS_To_AltAz(p_ITRS)
+            else:
+                e, p, _ = self._Propagate(to_Do_Sats, batch)
+                # The frame rotations are the same for every satellite so do
+                # them all in one go.
+                result = (e,) + self._Get_Transform().TEME_To_AltAz(p)
+        e, alt, az, distance = result
+
+        all_e[to_Do] = e
+        all_alt[to_Do] = alt
+        all_az[to_Do] = az
+        if ranges and distance is not None:
+            all_range[to_Do] = distance
+
+        if self.track_Cache is not None:
+            # Add this run's tracks (except anything SGP4 had trouble with,
+            # or without a range) to the ones already there, which might be
+            # for satellites that weren't asked for this time (eg after a
+            # search).
+            keep = ~np.any(all_e != 0, axis=1)
+            if distance is None:
+                keep[to_Do] = False
+            arrays = {"keys": np.array(keys)[keep], "alt": all_alt[keep],
+                      "az": all_az[keep], "range": all_range[keep]}
+            if cached is not None:
+                old = ~np.isin(cached["keys"], arrays["keys"])
+                arrays = {name: np.concatenate([cached[name][old], array])
+                          for name, array in arrays.items()}
+            self.track_Cache.Put(LD_Cache.Make_Key("tracks", *settings), arrays)
+
+        return all_e, all_alt, all_az, all_range if wanted_Range else None
+
+    def Calculate_Passes(self, satellites=None, batch=True, reference=False,
+                         ranges=False, dtype=np.float64, prefilter=None,
+                         incremental=False, adaptive=False, sunlit=False,
+                         shadow="conical", doppler=False):
+        """
+        Pass either a single LD_MyTLE object, or a list of them.
+        Or leave empty to do ALL of the satellites in the TLE List that was
+        loaded by Load_TLE_Data.
+
+        If batch is True, SGP4 is run for all of the satellites at once
+        (see _Propagate), otherwise it goes one satellite at a time.
+        If reference is True, astropy does the frame transforms for each
+        satellite separately instead of LD_Transform doing them all at once.
+        If Set_Workers was given more than one worker, the list is shared
+        between processes (see _Parallel_AltAz).
+
+        The results are kept in an LD_AltAzData as dtype arrays (float32 is
+        plenty for planning and halves the memory), optionally with the range
+        to each satellite as well.
+
+        If prefilter is given (the alt_Filter that will be used later),
+        satellites that can never get that high are skipped (see
+        Prefilter_Satellites).
+
+        If incremental is True and the time range has only slid along since
+        the last run, only the new time stamps are calculated (see
+        _Incremental_AltAz). Passes that span the old/new boundary are
+        joined up by Filter_Passes as usual.
+
+        If adaptive is True, each satellite is only propagated as often as
+        its orbit needs (see Sample_Strides): every time stamp for LEO, much
+        less often for MEO/GEO, with linear interpolation in between. The
+        results are still on the one common time grid (batch=False always
+        propagates every time stamp). It's off by default as it only saves
+        a little time (most of a typical list is LEO, eg active.txt at 1
+        minute steps only goes from 0.94 s to 0.65 s) and the interpolated
+        positions are slightly off. The other half, sampling fast LEOs more
+        densely than t_step, is done afterwards by Filter_Passes(dense=True)
+        only where a pass could have been missed.
+
+        If sunlit is True, whether each satellite is in the earth's shadow is
+        worked out at every time stamp too (see LD_Shadow for the shadow
+        models), and Filter_Passes adds how much of each pass is sunlit.
+
+        If doppler is True, the range and range rate to every satellite are
+        kept as well, and each pass's data gets range_rate and doppler
+        (factor, see LD_Transform.Doppler_Factor) columns. The satellites'
+        velocities are needed for this so they're propagated directly (no
+        track cache, worker processes, adaptive steps or incremental).
+        """
+
+        sats = self._Get_Satellites(satellites)
+        if prefilter is not None:
+            sats = self.Prefilter_Satellites(sats, prefilter)
         log.info(f"Calculating passes for {len(sats)} TLEs")
 
         # Get the cartesian coordinates (and speeds) of each satellite at each
         # point in the time series defined by Set_Time_Range().
         # Then convert to ITRS (which is apparently more standard than TEME)
-        self.altaz_Data = []
         self.errors = []
-        observer = astropy.coordinates.AltAz(location=self.here,
-                                             obstime=self.utc_Time_Series)
-        # Alledgedly sgp4 can take multiple satellites at once but it's plenty
-        # fast enough just utilizing the fact that it can return data for
-        # multiple time stamps at once.
-        for tle in sats:
-            log.info(f"Calculating pass data for {tle.name}")
-            sat = sgp4.api.Satrec.twoline2rv(tle[1], tle[2])
-            e, p, v = sat.sgp4_array(self.jd_Range, np.zeros_like(self.jd_Range))
-            if isinstance(e, int):
-                if e != 0:
-                    log.warning(f"Error with {tle.name}. Skipping")
-                    self.errors.append([tle.name, e])
-                    continue
-            elif isinstance(e, np.ndarray):
-                if sum(e) != 0:
-                    log.warning(f"Error with {tle.name}. Skipping")
-                    self.errors.append([tle.name, e])
-                    continue
-
-            # SGP4 gives results in some weird coordinate basis (True Equator
-            # Mean Equinox frame (TEME)). Get values in the right format to
-            # convert to something more intelligible and useful.
-            teme_p = astropy.coordinates.CartesianRepresentation(p * astropy.units.km, xyz_axis=1)
-            teme_v = astropy.coordinates.CartesianDifferential(v * (astropy.units.km / astropy.units.s), xyz_axis=1)
-
-            # Put the coordinates into astropy, which can convert between bases
-            # using International Terrestrial Reference System (ITRS) coordinates.
-            teme = astropy.coordinates.TEME(teme_p.with_differentials(teme_v), obstime=self.utc_Time_Series)
-            itrs = teme.transform_to(astropy.coordinates.ITRS(obstime=self.utc_Time_Series))
-
-            # Convert satellite coordinates (relative to earth) into alt/az
-            # from this position on earth (set by Set_Position).
-            view = itrs.transform_to(observer)
-            self.view = view
-            data = pd.DataFrame({
-                "time": self.utc_Time_Series,
-                "alt": view.alt.data.tolist(),
-                "az": view.az.data.tolist()
-                })
-            self.altaz_Data.append([tle, data])
+        self.track_Keys = None
+        utc_Times = self.utc_Time_Series
+        # The shadow calculation needs range, even if it's not kept.
+        keep_Range = ranges or doppler
+        need_Range = keep_Range or sunlit
+        all_rate = None
+        if not reference and not doppler:
+            all_e, all_alt, all_az, all_range = self._Calculate_AltAz(
+                sats, batch, need_Range, incremental, adaptive and batch)
+        else:
+            shape = (len(sats), len(utc_Times))
+            all_e = np.zeros(shape, dtype=np.uint8)
+            all_alt = np.zeros(shape)
+            all_az = np.zeros(shape)
+            all_range = np.zeros(shape) if need_Range else None
+            all_rate = np.zeros(shape) if doppler else None
+            if len(sats) > 0:
+                all_e, all_p, all_v = self._Propagate(sats, batch)
+                if not reference:
+                    transform = self._Get_Transform()
+                    p_ITRS, v_ITRS = transform.TEME_To_ITRS(all_p, all_v)
+                    all_alt, all_az, all_range = transform.ITRS_To_AltAz(p_ITRS)
+                    all_rate = transform.Range_Rate(p_ITRS, v_ITRS)
+                    del p_ITRS, v_ITRS
+
+        # Satellites that SGP4 complained about at any time are left out.
+        good = ~np.any(all_e != 0, axis=1)
+        for i in np.flatnonzero(~good):
+            log.warning(f"Error with {sats[i].name}. Skipping")
+            self.errors.append([sats[i].name, all_e[i]])
+
+        if reference:
+            observer = astropy.coordinates.AltAz(location=self.here,
+                                                 obstime=self.utc_Time_Series)
+            for i in np.flatnonzero(good):
+                log.debug(f"Calculating pass data for {sats[i].name}")
+                view = self._Reference_AltAz(all_p[i], all_v[i], observer)
+                self.view = view
+                all_alt[i] = view.alt.deg
+                all_az[i] = view.az.deg
+                if need_Range:
+                    all_range[i] = view.distance.to_value(astropy.units.km)
+                if doppler:
+                    all_rate[i] = view.radial_velocity.to_value(astropy.units.km / astropy.units.s)
+
+        good_Sunlit = None
+        if sunlit:
+            # Rather than keep the ITRS positions from each of the routes
+            # above, just get them back from alt/az/range.
+            transform = self._Get_Transform()
+            p_ITRS = transform.AltAz_To_ITRS(all_alt[good], all_az[good], all_range[good])
+            good_Sunlit = LD_Shadow.Sunlit(p_ITRS, transform.Sun_ITRS(), shadow)
+            del p_ITRS
+
+        self.altaz_Data = LD_AltAzData.LD_AltAzData(
+            [sats[i] for i in np.flatnonzero(good)],
+            utc_Times,
+            all_alt[good],
+            all_az[good],
+            all_range[good] if keep_Range else None,
+            dtype=dtype,
+            location=self.here,
+            sunlit=good_Sunlit,
+            range_Rate=all_rate[good] if doppler else None)
+        # If the tracks went through the track cache, Filter_Passes can keep
+        # the passes it finds in it too.
+        if self.track_Keys is not None:
+            self.altaz_Data.cache_Key = LD_Cache.Make_Key(
+                "passes", np.dtype(dtype).str, *[self.track_Keys[i] for i in np.flatnonzero(good)])
 
         if len(self.errors) > 0:
             log.warning(f"Some errors, see {self.errors}")
@@ -240,61 +1199,309 @@ class LD_PassFinder:
         log.info(f"Finished. {len(self.altaz_Data)} calculated with {len(self.errors)} errors")
         return self.altaz_Data
 
-    def Filter_Passes(self, alt_Filter):
+    def Set_Sites(self, sites):
+        """
+        Set several ground stations to plan for at once (see Calculate_Sites)
+        as a dict of name: (lat, long, height), like Set_Position takes.
+        """
+
+        log.info(f"Sites set to {list(sites)}")
+        self.sites = {
+            name: astropy.coordinates.EarthLocation(lat=lat, lon=long, height=height * astropy.units.m)
+            for name, (lat, long, height) in sites.items()
+            }
+        self.site_Data = {}
+        self.site_Passes = {}
+        return self.sites
+
+    def Select_Site(self, name):
+        """
+        Make one of the sites from Set_Sites the current site, and its
+        results (if there are any yet) the current results, so Filter_Passes,
+        Get_Pass_List, the plots etc. all work on that site.
+        """
+
+        self.here = self.sites[name]
+        if self.transform is not None:
+            self.transform.Set_Site(self.here)
+        if name in self.site_Data:
+            self.altaz_Data = self.site_Data[name]
+        if name in self.site_Passes:
+            self.pass_Data = self.site_Passes[name]
+        return self.here
+
+    def _Save_Site(self):
+        """
+        The current site and its results, for _Restore_Site to put back after
+        working through the other sites.
+        """
+        return (self.here, getattr(self, "altaz_Data", None), getattr(self, "pass_Data", None))
+
+    def _Restore_Site(self, saved):
+        """
+        Put back a site (and its results) from _Save_Site.
+        """
+
+        self.here, altaz_Data, pass_Data = saved
+        if self.transform is not None and self.here is not None:
+            self.transform.Set_Site(self.here)
+        if altaz_Data is not None:
+            self.altaz_Data = altaz_Data
+        if pass_Data is not None:
+            self.pass_Data = pass_Data
+
+    def Calculate_Sites(self, satellites=None, batch=True, ranges=False, dtype=np.float64,
+                        adaptive=False, sunlit=False, shadow="conical"):
+        """
+        Calculate_Passes for every site from Set_Sites, in one go. Each
+        satellite is only propagated and rotated into ITRS once, then only
+        the (cheap) topocentric step is done for each site. Whether each
+        satellite is sunlit doesn't depend on the site either so that's done
+        once too. The track cache and worker processes aren't used. adaptive
+        is as in Calculate_Passes (off by default).
+
+        Returns (and keeps in self.site_Data) a dict of name: LD_AltAzData.
+        Use Filter_Sites to get all of their passes, or Select_Site to look
+        at one of them. The current site (from Set_Position) and its results
+        are left as they were.
+        """
+
+        sats = self._Get_Satellites(satellites)
+        names = list(self.sites)
+        log.info(f"Calculating passes for {len(sats)} TLEs from {len(names)} sites")
+        self.errors = []
+        self.site_Data = {}
+        self.site_Passes = {}
+        if len(names) == 0:
+            return self.site_Data
+
+        # The frame rotations are the same for every site.
+        saved = self._Save_Site()
+        try:
+            self.Select_Site(names[0])
+            transform = self._Get_Transform()
+            if len(sats) == 0:
+                all_e = np.zeros((0, len(self.utc_Time_Series)), dtype=np.uint8)
+                p_ITRS = np.zeros(all_e.shape + (3,))
+            elif adaptive and batch:
+                # Interpolation errors are worst from whichever site is nearest
+                # the satellites, which is whichever is furthest from the centre
+                # of the earth.
+                highest = max(self.sites.values(), key=lambda x: np.linalg.norm(LD_Transform.Site_Basis(x)[0]))
+                all_e, p_ITRS = Strided_ITRS(
+                    [sgp4.api.Satrec.twoline2rv(tle[1], tle[2]) for tle in sats],
+                    self._Sample_Strides(sats, highest),
+                    self.jd_Range, self.fr_Range, transform.teme_To_ITRS)
+            else:
+                all_e, p, _ = self._Propagate(sats, batch)
+                p_ITRS = transform.TEME_To_ITRS(p)
+                del p
+
+            # Satellites that SGP4 complained about at any time are left out.
+            good = ~np.any(all_e != 0, axis=1)
+            for i in np.flatnonzero(~good):
+                log.warning(f"Error with {sats[i].name}. Skipping")
+                self.errors.append([sats[i].name, all_e[i]])
+            tles = [sats[i] for i in np.flatnonzero(good)]
+            p_ITRS = p_ITRS[good]
+
+            good_Sunlit = None
+            if sunlit:
+                good_Sunlit = LD_Shadow.Sunlit(p_ITRS, transform.Sun_ITRS(), shadow)
+
+            for name in names:
+                position, basis = LD_Transform.Site_Basis(self.sites[name])
+                alt, az, distance = LD_Transform.Topocentric(position, basis, p_ITRS)
+                self.site_Data[name] = LD_AltAzData.LD_AltAzData(
+                    tles, self.utc_Time_Series, alt, az,
+                    distance if ranges else None,
+                    dtype=dtype,
+                    location=self.sites[name],
+                    sunlit=good_Sunlit)
+        finally:
+            self._Restore_Site(saved)
+
+        if len(self.errors) > 0:
+            log.warning(f"Some errors, see {self.errors}")
+        return self.site_Data
+
+    def Filter_Sites(self, alt_Filter, refine=False):
+        """
+        Filter_Passes for every site from Calculate_Sites. Returns (and keeps
+        in self.site_Passes) a dict of name: pass_Data. The current site and
+        its results are left as they were.
+        """
+
+        saved = self._Save_Site()
+        try:
+            for name in self.site_Data:
+                self.Select_Site(name)
+                self.site_Passes[name] = self.Filter_Passes(alt_Filter, refine)
+        finally:
+            self._Restore_Site(saved)
+        return self.site_Passes
+
+    def _AltAz_At(self, satrec, seconds, transform=None, offset=0):
+        """
+        Alt/az of one satellite (an sgp4 Satrec) at any time (in seconds
+        since t_start), not just at the time stamps in utc_Time_Series.
+        By default the frame rotations for the whole time range are used, or
+        pass a transform that starts at time stamp number "offset".
+        """
+
+        if transform is None:
+            transform = self._Get_Transform()
+        _, p, _ = satrec.sgp4(self.jd_Range[0], self.fr_Range[0] + seconds / 86400)
+        index = seconds / self.t_step.total_seconds() - offset
+        alt, az, _ = transform.TEME_To_AltAz_At(np.array(p), index)
+        return alt, az
+
+    def _Refine_Pass(self, sat, start, peak, end, n_Times, transform=None, offset=0, local=False):
+        """
+        The pass data is only as precise as t_step, so use the time stamps
+        either side of the horizon crossings and the peak as brackets and
+        find them properly with a root finder (for rise/set) and a bounded
+        minimizer (for the peak).
+
+        If local is True, frame rotations are made for just the time stamps
+        at the ends of each bracket rather than using ones for the whole
+        pass (or time range), see _AltAz_At for transform and offset.
+
+        Returns the AOS, peak and LOS times (seconds since t_start) and the
+        alt/az at the peak.
+        """
+
+        satrec = sgp4.api.Satrec.twoline2rv(sat[1], sat[2])
+        step = self.t_step.total_seconds()
+        tolerance = 0.01
+        frames = [transform, offset]
+
+        def around(first, last):
+            if local:
+                first, last = max(first, 0), min(last, n_Times - 1)
+                frames[:] = [LD_Transform.LD_Transform(self.utc_Time_Series[first:last + 1], self.here), first]
+
+        def alt(seconds):
+            return self._AltAz_At(satrec, seconds, *frames)[0]
+
+        def crossing(below, above):
+            # brentq needs the alt to change sign inside the bracket, which
+            # it might not quite do if the satellite skims the horizon.
+            if np.sign(alt(below)) == np.sign(alt(above)):
+                return above
+            return scipy.optimize.brentq(alt, below, above, xtol=tolerance)
+
+        # If the pass is cut off by the start/end of the time range there's
+        # no crossing to find.
+        aos = start * step
+        if start > 0:
+            around(start - 1, start)
+            aos = crossing((start - 1) * step, aos)
+        los = end * step
+        if end < n_Times - 1:
+            around(end, end + 1)
+            los = crossing((end + 1) * step, los)
+
+        # The true peak is somewhere between the samples either side of the
+        # highest one.
+        around(peak - 1, peak + 1)
+        result = scipy.optimize.minimize_scalar(
+            lambda seconds: -alt(seconds),
+            bounds=(max(aos, (peak - 1) * step), min(los, (peak + 1) * step)),
+            method="bounded",
+            options={"xatol": tolerance})
+        peak_Time = result.x
+        peak_Alt, peak_Az = self._AltAz_At(satrec, peak_Time, *frames)
+
+        return aos, peak_Time, los, peak_Alt, peak_Az
+
+    def _Seconds_To_Local(self, seconds):
+        """
+        Convert seconds since t_start into a datetime in the local time zone
+        (or an array of seconds into an array of them).
+        """
+
+        return LD_AltAzData.To_Datetimes(
+            self.t_start + astropy.time.TimeDelta(seconds, format="sec"), self.my_tz)
+
+    def Filter_Passes(self, alt_Filter, refine=False, constraints=None, dense=False):
         """
         Filter out all of the data from the passes where the satellite peaks
         below "alt_Filter" degrees altitude.
+
+        constraints (an LD_Constraints constraint or a list of them) limit
+        when a satellite counts as trackable on top of being above the
+        horizon, eg an azimuth sector or a minimum Sun separation. The
+        "passes" are then the stretches where they are all satisfied, so
+        AOS/LOS are when it enters/leaves the allowed region.
+
+        If refine is True, the AOS/LOS and peak times are found to sub-second
+        precision (see _Refine_Pass) rather than to the nearest t_step. Only
+        the horizon crossings are refined, AOS/LOS set by constraints stay on
+        the time stamps.
+
+        If dense is True, fast (LEO) satellites are also looked at between
+        the time stamps wherever a pass could have been missed, see
+        _Dense_Passes. Passes found that way always have refined times, and
+        the pass data of one that's entirely between two time stamps is
+        empty. Not used with constraints.
+
+        If Calculate_Passes worked out when the satellites are sunlit, each
+        pass's info also gets the fraction of the pass that's sunlit and the
+        first/last sunlit times in it (None if it's never sunlit, and from
+        the nearest time stamp for a pass that's between them).
+
+        If the tracks came through the track cache, the passes found (and
+        refined) are kept there too, see _Find_Passes.
         """
 
         log.info(f"Filtering passes with peaks below {alt_Filter} degrees alt")
+        if dense and constraints is not None:
+            log.warning("Dense pass search doesn't work with constraints, not using it")
+            dense = False
 
         # Container for the pass data, each line will comprise the satellite
-        # [name, [peak time, peak alt, az@peak], pass data] where pass data is
-        # alt/az values for when the satellite is above the horizon.
+        # [name, [peak time, peak alt, az@peak, AOS time, LOS time], pass data]
+        # where pass data is alt/az values for when the satellite is above the
+        # horizon (an LD_PassTrack, so nothing is made until it's looked at).
         self.pass_Data = []
-        for sat, data in self.altaz_Data:
-            # Find the local maxima in the each satellite's tracks (there may
-            # be more than one!)
-            alt_peaks = scipy.signal.argrelextrema(data["alt"].values, np.greater)[0]
-
-            # Look at each peak separately.
-            for peak in alt_peaks:
-                # Get the data at the peak
-                time, alt, az = data.iloc[peak]
-
-                # If the peak is high enough to be worth trying to look at.
-                if alt > alt_Filter:
-
-                    # First, scan forwards to find when the satellite drops
-                    # back below the horizon. This finds the end of the pass.
-                    i = peak
-                    search_alt = alt
-                    while search_alt > 0:
-                        i += 1
-                        if i >= len(data):
-                            break
-                        search_alt = data.iloc[i]["alt"]
-                    end = (i - 1)
-
-                    # Then scan backwards from the peak to find when the
-                    # satellite first came up over the horizon to find the
-                    # start of the pass
-                    search_alt = alt
-                    while search_alt > 0:
-                        i -= 1
-                        if i < 0:
-                            break
-                        search_alt = data.iloc[i]["alt"]
-                    start = (i + 1)
-
-                    # Extract the portion of the satellite's track data where
-                    # it was above the horizon *this time*
-                    pass_Isolated = data[start:end]
-
-                    # Add to the rest.
-                    # NOTE datetime is converted from UTC back to local TZ here!
-                    peak_Info = [time.to_datetime(self.my_tz), alt, az]
-                    self.pass_Data.append([sat, peak_Info, pass_Isolated])
+        found = self._Find_Passes(alt_Filter, refine, constraints, dense)
+        rows, starts, ends, peaks = [found[x] for x in ("rows", "starts", "ends", "peaks")]
+
+        # NOTE datetime is converted from UTC back to local TZ here!
+        # Converting astropy times is slow, so the time stamps are only
+        # converted once and the peak/start/end times picked out of them...
+        local_Times = self.altaz_Data.Datetimes(self.my_tz)
+        peak_Times, start_Times, end_Times = local_Times[peaks], local_Times[starts], local_Times[ends]
+        peak_Alt = self.altaz_Data.alt[rows, peaks].astype(np.float64)
+        peak_Az = self.altaz_Data.az[rows, peaks].astype(np.float64)
+        # ... and any refined ones are converted in one go.
+        refined = found.get("refined")
+        if refined is not None:
+            exact = ~np.isnan(refined[:, 0])
+            if exact.any():
+                peak_Times[exact], start_Times[exact], end_Times[exact] = \
+                    self._Seconds_To_Local(refined[exact, :3].T)[[1, 0, 2]]
+                peak_Alt[exact] = refined[exact, 3]
+                peak_Az[exact] = refined[exact, 4]
+
+        sunlit = self.altaz_Data.sunlit
+        if len(rows) > 0 and sunlit is not None:
+            lit_Info = self._Sunlit_Info(sunlit, rows, np.minimum(starts, peaks), np.maximum(ends, peaks))
+
+        for i, (row, start, end) in enumerate(zip(rows.tolist(), starts.tolist(), ends.tolist())):
+            sat = self.altaz_Data.tles[row]
+
+            # Extract the portion of the satellite's track data where
+            # it was above the horizon *this time*
+            pass_Isolated = self.altaz_Data.Pass(row, start, end + 1)
+
+            # Add to the rest.
+            peak_Info = [peak_Times[i], float(peak_Alt[i]), float(peak_Az[i]),
+                         start_Times[i], end_Times[i]]
+            if sunlit is not None:
+                peak_Info.extend(lit_Info[i])
+            self.pass_Data.append([sat, peak_Info, pass_Isolated])
 
         # Sort the passes into chronological order (by peak time), this makes
         # display and plotting easier and prettier.
@@ -302,9 +1509,287 @@ class LD_PassFinder:
         log.info(f"{len(self.pass_Data)} passes satisfy alt filter")
         return self.pass_Data
 
+    def _Find_Passes(self, alt_Filter, refine, constraints, dense=False):
+        """
+        The segmenting part of Filter_Passes. Returns a dict of arrays of the
+        row, first, last and peak time stamp of every pass, plus (if refine
+        or dense) the refined AOS, peak and LOS times and alt/az at the peak
+        (n_passes x 5, see _Refine_Pass, NaN for passes that weren't
+        refined).
+
+        These only depend on the tracks (and alt_Filter, refine and dense),
+        so if the tracks came through the track cache they're kept there too
+        and the same filtering next time is just a lookup. Constraints could
+        be anything so passes found with them aren't cached.
+        """
+
+        key = None
+        if self.track_Cache is not None and constraints is None and self.altaz_Data.cache_Key is not None:
+            key = LD_Cache.Make_Key(self.altaz_Data.cache_Key, float(alt_Filter), bool(refine), bool(dense))
+            found = self.track_Cache.Get(key)
+            if found is not None:
+                log.info(f"{len(found['rows'])} passes loaded from cache")
+                return found
+
+        names = ("rows", "starts", "ends", "peaks")
+        found = {x: np.zeros(0, dtype=int) for x in names}
+        low = found
+        if len(self.altaz_Data) > 0:
+            # Do the segmenting for every satellite at once rather than
+            # scanning each satellite's track one sample at a time.
+            alt_Data = self.altaz_Data.alt
+            mask = alt_Data > 0
+            if constraints is not None:
+                constraint = LD_Constraints.Combine(constraints)
+                log.info(f"Applying constraints {constraint}")
+                mask &= constraint.Mask(self.altaz_Data, self._Get_Transform())
+            rows, starts, ends = Find_Segments(mask)
+            peaks = Segment_Peaks(alt_Data, rows, starts, ends)
+            # If the peak is high enough to be worth trying to look at.
+            high = alt_Data[rows, peaks] > alt_Filter
+            found = {"rows": rows[high], "starts": starts[high], "ends": ends[high], "peaks": peaks[high]}
+            low = {"rows": rows[~high], "starts": starts[~high], "ends": ends[~high], "peaks": peaks[~high]}
+
+        if refine or dense:
+            found["refined"] = np.full((len(found["rows"]), 5), np.nan)
+        if refine:
+            n_Times = len(self.altaz_Data.utc_Times)
+            found["refined"] = np.array(
+                [self._Refine_Pass(self.altaz_Data.tles[row], start, peak, end, n_Times)
+                 for row, start, end, peak in zip(*[found[x].tolist() for x in names])],
+                dtype=np.float64).reshape(-1, 5)
+        if dense and len(self.altaz_Data) > 0:
+            more = self._Dense_Passes(alt_Filter, low)
+            found = {x: np.concatenate([found[x], more[x]]) for x in found}
+
+        if key is not None:
+            self.track_Cache.Put(key, found)
+        return found
+
+    def _Dense_Passes(self, alt_Filter, low):
+        """
+        Passes that sampling at the time stamps misses: fast LEOs can go
+        higher than alt_Filter (or even rise and set) between two time
+        stamps. If the alt is concave around a peak, the real peak can't be
+        more than the biggest change over one step either side above the
+        highest sample, so only the peaks where that could reach alt_Filter
+        are looked at, by sampling the satellite densely between the time
+        stamps either side of them (see _Refine_Pass). That's almost only
+        LEO, slower satellites barely move in one step.
+
+        low is Find_Segments style arrays (as a dict like _Find_Passes
+        returns) of the segments above the horizon that peaked below
+        alt_Filter. Returns the passes found in the same form as
+        _Find_Passes, with refined times. A pass entirely between two time
+        stamps has its (unrefined) start after its end, so no time stamps in
+        it, and its peak is the nearest time stamp.
+        """
+
+        alt = self.altaz_Data.alt
+        n_Times = alt.shape[1]
+        step = self.t_step.total_seconds()
+        threshold = max(alt_Filter, 0)
+
+        # How far above each sampled local maximum the real peak could be.
+        middle = alt[:, 1:-1]
+        rise = np.full(alt.shape, -np.inf)
+        rise[:, 1:-1] = np.where((middle >= alt[:, :-2]) & (middle >= alt[:, 2:]),
+                                 np.maximum(middle - alt[:, :-2], middle - alt[:, 2:]), -np.inf)
+        could = alt + rise > threshold
+
+        # Segments above the horizon that might really peak above alt_Filter,
+        # and peaks below the horizon that might really be above it.
+        candidates = [(row, start, peak, end) for row, start, end, peak in
+                      zip(*[low[x].tolist() for x in ("rows", "starts", "ends", "peaks")])
+                      if could[row, peak]]
+        hidden = np.nonzero(could & (alt <= 0))
+        candidates += [(row, None, peak, None) for row, peak in zip(*[x.tolist() for x in hidden])]
+        log.info(f"Looking between time stamps for {len(candidates)} possible passes")
+
+        found = {x: [] for x in ("rows", "starts", "ends", "peaks", "refined")}
+        for row, start, peak, end in candidates:
+            sat = self.altaz_Data.tles[row]
+            if start is not None:
+                refined = self._Refine_Pass(sat, start, peak, end, n_Times)
+            else:
+                satrec = sgp4.api.Satrec.twoline2rv(sat[1], sat[2])
+
+                def alt_At(seconds):
+                    return self._AltAz_At(satrec, seconds)[0]
+
+                def crossing(below, above):
+                    # As in _Refine_Pass, in case the samples either side
+                    # come out just above the horizon this time.
+                    if np.sign(alt_At(below)) == np.sign(alt_At(above)):
+                        return below
+                    return scipy.optimize.brentq(alt_At, below, above, xtol=0.01)
+
+                result = scipy.optimize.minimize_scalar(
+                    lambda seconds: -alt_At(seconds),
+                    bounds=((peak - 1) * step, (peak + 1) * step),
+                    method="bounded",
+                    options={"xatol": 0.01})
+                if -result.fun <= threshold:
+                    continue
+                aos = crossing((peak - 1) * step, result.x)
+                los = crossing((peak + 1) * step, result.x)
+                refined = (aos, result.x, los) + tuple(self._AltAz_At(satrec, result.x))
+                start = int(np.ceil(aos / step))
+                end = int(np.floor(los / step))
+            if refined[3] <= threshold:
+                continue
+            found["rows"].append(row)
+            found["starts"].append(start)
+            found["ends"].append(end)
+            found["peaks"].append(peak)
+            found["refined"].append(refined)
+
+        log.info(f"{len(found['rows'])} passes found between time stamps")
+        refined = np.array(found.pop("refined"), dtype=np.float64).reshape(-1, 5)
+        found = {x: np.array(values, dtype=int) for x, values in found.items()}
+        found["refined"] = refined
+        return found
+
+    def _Sunlit_Info(self, sunlit, rows, starts, ends):
+        """
+        For each pass (given by Find_Segments style rows, starts and ends) get
+        [fraction of the pass that's sunlit, first sunlit time, last sunlit
+        time], times in local TZ or None if it's never sunlit.
+        """
+
+        info = []
+        indices = []
+        for row, start, end in zip(rows, starts, ends):
+            lit = np.flatnonzero(sunlit[row, start:end + 1])
+            info.append([lit.size / (end + 1 - start), None, None])
+            if lit.size > 0:
+                indices.extend([start + lit[0], start + lit[-1]])
+
+        # Again, pick them out of the converted time stamps.
+        if len(indices) > 0:
+            local_Times = iter(self.altaz_Data.Datetimes(self.my_tz)[indices])
+            for line in info:
+                if line[0] > 0:
+                    line[1] = next(local_Times)
+                    line[2] = next(local_Times)
+        return info
+
+    def Stream_Passes(self, alt_Filter, satellites=None, chunk_Size=1440, refine=False,
+                      prefilter=None):
+        """
+        Generator version of Calculate_Passes + Filter_Passes for long time
+        ranges. The time range is done chunk_Size time stamps at a time and
+        each pass is yielded (in the same [sat, peak_Info, pass data] format
+        as Filter_Passes) as soon as the satellite sets. For passes that are
+        still going at the end of a chunk only where they started and their
+        highest point so far are carried over to the next one, so memory
+        depends on the chunk size rather than the time range (even for a
+        GEO satellite that's up the whole time). The pass data of each pass
+        is worked out again when (if) it's looked at, see _Stream_Track.
+
+        NOTE passes come out in the order they finish, not by peak time.
+        If prefilter is given (usually alt_Filter), satellites that can
+        never get that high are skipped first (see Prefilter_Satellites).
+        """
+
+        sats = self._Get_Satellites(satellites)
+        if prefilter is not None:
+            sats = self.Prefilter_Satellites(sats, prefilter)
+        n_Times = len(self.utc_Time_Series)
+        log.info(f"Streaming passes for {len(sats)} TLEs, {n_Times} time stamps in chunks of {chunk_Size}")
+
+        self.errors = []
+        if len(sats) == 0:
+            return
+        sat_Array = sgp4.api.SatrecArray(
+            [sgp4.api.Satrec.twoline2rv(tle[1], tle[2]) for tle in sats]
+            )
+        good = np.ones(len(sats), dtype=bool)
+        # Passes still going at the end of the last chunk. Keyed by satellite
+        # index, values are [first time stamp, peak time stamp, peak alt,
+        # peak az].
+        open_Passes = {}
+
+        for first in range(0, n_Times, chunk_Size):
+            last = min(first + chunk_Size, n_Times)
+            final_Chunk = (last == n_Times)
+
+            e, p, _ = sat_Array.sgp4(self.jd_Range[first:last], self.fr_Range[first:last])
+            transform = self._Make_Transform(self.utc_Time_Series[first:last])
+            alt, az, _ = transform.TEME_To_AltAz(p)
+            del p
+
+            # Satellites that SGP4 complains about are dropped from then on.
+            bad = good & np.any(e != 0, axis=1)
+            for i in np.flatnonzero(bad):
+                log.warning(f"Error with {sats[i].name}. Skipping")
+                self.errors.append([sats[i].name, e[i]])
+                open_Passes.pop(i, None)
+            good &= ~bad
+            above = (alt > 0) & good[:, None]
+
+            # Passes that finished exactly at the end of the last chunk.
+            for i in [i for i in open_Passes if not above[i, 0]]:
+                finished = self._Close_Pass(sats[i], *open_Passes.pop(i), first - 1, alt_Filter, refine)
+                if finished is not None:
+                    yield finished
+
+            rows, starts, ends = Find_Segments(above)
+            peaks = Segment_Peaks(alt, rows, starts, ends)
+            for row, start, end, peak in zip(rows.tolist(), starts.tolist(), ends.tolist(), peaks.tolist()):
+                state = [first + start, first + peak, float(alt[row, peak]), float(az[row, peak])]
+                # Carry on from the last chunk? (keeping the higher peak)
+                if start == 0 and row in open_Passes:
+                    old = open_Passes.pop(row)
+                    state[0] = old[0]
+                    if old[2] >= state[2]:
+                        state[1:] = old[1:]
+
+                # Still going at the end of this chunk.
+                if end == last - first - 1 and not final_Chunk:
+                    open_Passes[row] = state
+                    continue
+
+                finished = self._Close_Pass(sats[row], *state, first + end, alt_Filter, refine)
+                if finished is not None:
+                    yield finished
+
+        if len(self.errors) > 0:
+            log.warning(f"Some errors, see {self.errors}")
+
+    def _Close_Pass(self, sat, start, peak, peak_Alt, peak_Az, end, alt_Filter, refine):
+        """
+        Turn a finished pass from Stream_Passes (time stamp numbers of its
+        start, peak and end, and the alt/az at the peak) into a pass_Data row
+        (or None if its peak is below alt_Filter).
+        """
+
+        if peak_Alt <= alt_Filter:
+            return None
+        n_Times = len(self.utc_Time_Series)
+
+        # Only made if it's looked at.
+        pass_Isolated = LD_AltAzData.LD_PassTrack(
+            functools.partial(_Stream_Track, sat, self.utc_Time_Series[start:end + 1], self.here),
+            0, start, end + 1, base=start)
+
+        # NOTE datetime is converted from UTC back to local TZ here!
+        if refine:
+            # Only the frame rotations around the crossings and the peak are
+            # needed, not the whole pass.
+            aos, time, los, peak_Alt, peak_Az = self._Refine_Pass(sat, start, peak, end, n_Times, local=True)
+            times = self._Seconds_To_Local(np.array([time, aos, los]))
+        else:
+            times = LD_AltAzData.To_Datetimes(self.utc_Time_Series[[peak, start, end]], self.my_tz)
+        peak_Info = [times[0], float(peak_Alt), float(peak_Az), times[1], times[2]]
+
+        return [sat, peak_Info, pass_Isolated]
+
     def Get_Pass_List(self):
         """
-        Return a neat list of just the TLE, peak time, peak alt, az@peak
+        Return a neat list of just the TLE, peak time, peak alt, az@peak and
+        the AOS/LOS times (plus the sunlit fraction and times, if there are
+        any).
         """
 
         pass_List = []
@@ -317,8 +1802,16 @@ class LD_PassFinder:
                 "satellite": name.rstrip(),
                 "time": time,
                 "alt": alt,
-                "az": az
+                "az": az,
+                "aos": str(sat[1][3]),
+                "los": str(sat[1][4])
                 })
+            if len(sat[1]) > 5:
+                pass_List[-1].update({
+                    "sunlit": sat[1][5],
+                    "lit_from": str(sat[1][6]),
+                    "lit_until": str(sat[1][7])
+                    })
         return pd.DataFrame(pass_List)
 
     def Print_Pass_List(self):
@@ -369,8 +1862,9 @@ class LD_PassFinder:
 
         fig, my_ax = plt.subplots()
         my_ax.xaxis.set_major_formatter(matplotlib.dates.DateFormatter("%H:%M:%S"))
-        for sat, data in self.altaz_Data:
-            data.plot(x="time", y="alt", ax=my_ax, rot=90)
+        my_ax.xaxis.set_tick_params(rotation=90)
+        # Straight from the arrays, one line per satellite.
+        my_ax.plot(self.altaz_Data.utc_Times.plot_date, self.altaz_Data.alt.T)
         plt.show()
 
 
@@ -385,8 +1879,10 @@ class LD_PassFinder:
         fig, my_ax = plt.subplots()
 
         for sat, peak_Info, data in self.pass_Data:
-            # Make timestamps that matplotlib can understand.
-            x_data = [x.plot_date for x in data["time"].values]
+            # Make timestamps that matplotlib can understand. The pass data
+            # is indexed by position in the time stamps so take them from the
+            # shared time vector rather than converting each Time object.
+            x_data = self.altaz_Data.utc_Times[data.start:data.stop].plot_date
             # Altitude is the only particularly interesting feature for these
             # purposes (plotting azimuth as well would be confusing)
             y_data = data["alt"]
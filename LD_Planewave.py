@@ -143,7 +143,7 @@ class LD_Planewave:
         log.debug(f"Telescope says {response}")
         return response
 
-    def Mount_Offset(self):
+    def Mount_Offset(self, **kwargs):
         """
         One or more of the following offsets can be specified as a keyword argument:
 
@@ -170,7 +170,34 @@ class LD_Planewave:
         mount_offset(axis0_add_arcsec=-30, axis0_set_rate_arcsec_per_sec=1, transverse_reset=0)
 
         """
-        raise NotImplementedError
+        log.debug(f"Mount offset {kwargs}")
+        response = self._SendMsg(["mount", "offset"], **kwargs)
+        log.debug(f"Telescope says {response}")
+        return response
+
+    def Follow_Body(self, ra_Hours, dec_Degrees, ra_Rate=0, dec_Rate=0):
+        """
+        Go to an apparent RA/Dec and then keep moving at ra_Rate/dec_Rate
+        (arcsec/s) on top of normal tracking, for things that move against
+        the stars like the Moon. See LD_PassFinder.Body_RaDec for where to
+        get these from.
+        """
+
+        log.debug(f"Follow body at {ra_Hours}h, {dec_Degrees}deg moving {ra_Rate}, {dec_Rate} arcsec/s")
+        # Clear any rates left over from following something else.
+        self.Mount_Offset(ra_reset=0, dec_reset=0)
+        response = self.Goto_RaDec_Apparent(ra_Hours, dec_Degrees)
+        self.Mount_Offset(ra_set_rate_arcsec_per_sec=ra_Rate,
+                          dec_set_rate_arcsec_per_sec=dec_Rate)
+        return response
+
+    def Follow_Moon(self, finder, when=None):
+        """
+        Go to the Moon and track it. finder is an LD_PassFinder (with its
+        position set) to work out where the Moon is.
+        """
+
+        return self.Follow_Body(*finder.Body_RaDec("moon", when))
 
     def Park(self):
         log.debug("Park mount")
@@ -0,0 +1,75 @@
+"""
+Is a satellite in the Earth's shadow? For optical work a satellite is only
+any use while the Sun is shining on it.
+
+Everything works on whole (n_sats x n_times x 3) arrays of ITRS positions at
+once, with the Sun position (n_times x 3, see LD_Transform.Sun_ITRS) shared
+between all of the satellites.
+
+Two models:
+    - "cylindrical": the shadow is a cylinder the width of the earth
+    pointing directly away from the Sun. Simple and a little pessimistic.
+    - "conical": the umbra is a cone since the Sun isn't a point. A
+    satellite is counted as sunlit unless it's fully in the umbra (so in the
+    penumbra counts as lit, if dimmer).
+"""
+
+import logging
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# Equatorial radius of the earth and the radius of the Sun, km.
+EARTH_RADIUS = 6378.137
+SUN_RADIUS = 696000.0
+
+MODELS = ("cylindrical", "conical")
+
+
+def Cylindrical(p_Sat, p_Sun):
+    """
+    True where each satellite (... x n_times x 3) is outside the cylinder of
+    shadow behind the earth.
+    """
+
+    sun_Direction = p_Sun / np.linalg.norm(p_Sun, axis=-1, keepdims=True)
+    along = np.einsum("...i,...i->...", p_Sat, sun_Direction)
+    across = np.linalg.norm(p_Sat - along[..., None] * sun_Direction, axis=-1)
+    return (along > 0) | (across > EARTH_RADIUS)
+
+
+def Conical(p_Sat, p_Sun):
+    """
+    True where each satellite (... x n_times x 3) can see at least some of
+    the Sun's disc past the earth.
+    """
+
+    to_Sun = p_Sun - p_Sat
+    sun_Distance = np.linalg.norm(to_Sun, axis=-1)
+    earth_Distance = np.linalg.norm(p_Sat, axis=-1)
+
+    # Angular radii of the earth and the Sun from the satellite, and the
+    # angle between their centres.
+    earth_Radius = np.arcsin(np.clip(EARTH_RADIUS / earth_Distance, -1, 1))
+    sun_Radius = np.arcsin(np.clip(SUN_RADIUS / sun_Distance, -1, 1))
+    cos_Separation = np.einsum("...i,...i->...", -p_Sat, to_Sun) / (earth_Distance * sun_Distance)
+    separation = np.arccos(np.clip(cos_Separation, -1, 1))
+
+    # Fully eclipsed only if the Sun's disc is entirely behind the earth's.
+    return separation > earth_Radius - sun_Radius
+
+
+def Sunlit(p_Sat, p_Sun, model="conical"):
+    """
+    Boolean array (p_Sat.shape[:-1]) of whether each satellite position
+    (ITRS, km) is sunlit, given the Sun's position (ITRS, km, one per time
+    stamp) and a shadow model (see MODELS).
+    """
+
+    if model == "cylindrical":
+        return Cylindrical(p_Sat, p_Sun)
+    elif model == "conical":
+        return Conical(p_Sat, p_Sun)
+    else:
+        raise ValueError(f"Unknown shadow model {model}, pick from {MODELS}")
@@ -0,0 +1,331 @@
+"""
+Bulk TLE parser. Turns a whole file of TLEs into columns of elements in one
+go, rather than building and checking every TLE one at a time.
+
+Lines 1 and 2 of every TLE are put into (69 x n_TLEs) arrays of characters,
+then each field is read out of its columns for all of the TLEs at once, and
+the checksums and guaranteed blank columns are checked the same way. The
+result is a numpy structured array with one row per TLE, which LD_MyTLE
+objects are views of.
+
+Usage:
+    - catalog = LD_TLECatalog.From_Lines(open("tle_Files/active.txt").read().split("\\n"))
+    - catalog.elements["inclination"] etc. for the columns
+    - catalog.problems is non zero for any TLEs that failed the checks (see
+      Problem_Text). With check=False the checks are left until
+      catalog.Check() is called.
+"""
+
+import logging
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+LINE_LENGTH = 69
+
+# Column numbers that are always blank in well formed TLE lines.
+BLANKS_LINE1 = [1, 8, 17, 32, 43, 52, 61, 63]
+BLANKS_LINE2 = [1, 7, 16, 25, 33, 42, 51]
+
+# One row per TLE. Names are the same as the LD_MyTLE properties where there
+# is one.
+ELEMENTS = np.dtype([
+    ("catalog_Number", np.int32),
+    ("classification", "S1"),
+    ("launch_year", np.int16),
+    ("launch_num", np.int16),
+    ("inter_des", "S3"),
+    ("epoch_year", np.int16),
+    ("epoch_days", np.float64),
+    ("first_derivative", np.float64),
+    ("second_derivative", np.float64),
+    ("drag_term", np.float64),
+    ("ephemeris_type", np.int8),
+    ("set_number", np.int16),
+    ("checksum_1", np.int8),
+    ("inclination", np.float64),
+    ("raan", np.float64),
+    ("eccentricity", np.float64),
+    ("perigree", np.float64),
+    ("mean_anomaly", np.float64),
+    ("mean_motion", np.float64),
+    ("revolution_number", np.int32),
+    ("checksum_2", np.int8)
+    ])
+
+# Bit flags for catalog.problems.
+PROBLEMS = {
+    1: "line 1 doesn't start with 1 or line 2 doesn't start with 2",
+    2: "non blank character in a blank column",
+    4: "unreadable number",
+    8: "ephemeris type isn't 0",
+    16: "catalog numbers of lines 1 and 2 don't match",
+    32: "line 1 checksum is wrong",
+    64: "line 2 checksum is wrong"
+    }
+
+# What each character counts as in a checksum, see Checksums.
+CHECKSUM_VALUES = np.zeros(256, dtype=np.int32)
+CHECKSUM_VALUES[ord("0"):ord("9") + 1] = np.arange(10)
+CHECKSUM_VALUES[ord("-")] = 1
+
+# Powers of ten that are exact as floats, for _Digits.
+POWERS = np.array([10.0**i for i in range(23)])
+
+def _Chars(lines):
+    """
+    (69 x n_lines) uint8 array of the characters of the lines, so row j is
+    column j of every line (which makes reading a field out of all the lines
+    quick). Short lines are padded with zeros (which then fail the blank
+    column checks), long ones cut off.
+    """
+
+    try:
+        text = np.array(lines, dtype=f"S{LINE_LENGTH}")
+    except UnicodeEncodeError:
+        # Something that isn't ascii, which can't be a valid TLE line anyway.
+        text = np.array([x.encode("ascii", "replace") for x in lines], dtype=f"S{LINE_LENGTH}")
+    return np.ascontiguousarray(text.reshape(-1).view(np.uint8).reshape(-1, LINE_LENGTH).T)
+
+def _Text(chars):
+    """
+    The strings in some columns of a _Chars array, whitespace stripped.
+    """
+    width = chars.shape[0]
+    return np.char.strip(np.ascontiguousarray(chars.T).view(f"S{width}").reshape(-1))
+
+def _Digits(chars, implied_Point=False):
+    """
+    Read a number out of some columns of a _Chars array, for every line at
+    once. The numbers can have a sign and a decimal point (or an assumed one
+    before the first digit if implied_Point is True, like the eccentricity).
+
+    Returns the digits as an integer, the number of them after the decimal
+    point, whether the number is negative and whether it was a readable
+    number at all.
+    """
+
+    mantissa = np.zeros(chars.shape[1], dtype=np.int64)
+    decimals = np.zeros(chars.shape[1], dtype=np.int64)
+    after_Point = np.full(chars.shape[1], implied_Point)
+    negative = np.zeros(chars.shape[1], dtype=bool)
+    ok = np.ones(chars.shape[1], dtype=bool)
+    any_Digits = np.zeros(chars.shape[1], dtype=bool)
+
+    # Fields are at most a dozen characters, so go along them a character
+    # at a time (for all the lines at once).
+    for c in chars:
+        digit = (c >= ord("0")) & (c <= ord("9"))
+        point = c == ord(".")
+        minus = c == ord("-")
+        mantissa = np.where(digit, mantissa * 10 + (c - ord("0")), mantissa)
+        decimals += digit & after_Point
+        # No more than one point and one sign, nothing but digits, points,
+        # signs and spaces.
+        ok &= ~(point & after_Point) & ~(minus & negative)
+        ok &= digit | point | minus | (c == ord(" ")) | (c == ord("+"))
+        after_Point |= point
+        negative |= minus
+        any_Digits |= digit
+
+    return mantissa, decimals, negative, ok & any_Digits
+
+def _Number(chars, implied_Point=False):
+    """
+    A number from _Digits as a float. Dividing the integer by an exact power
+    of ten gives exactly the same float as float(string) does.
+
+    Returns the values and whether each one was readable.
+    """
+
+    mantissa, decimals, negative, ok = _Digits(chars, implied_Point)
+    value = mantissa / POWERS[np.minimum(decimals, len(POWERS) - 1)]
+    return np.where(negative, -value, value), ok
+
+def _Exponent(chars):
+    """
+    Read the "assumed decimal point" numbers (eg " 12345-4" = 0.12345e-4) of
+    the second derivative and drag term.
+    """
+
+    mantissa, decimals, negative, ok_Mantissa = _Digits(chars[:-2], implied_Point=True)
+    exponent, ok_Exponent = _Number(chars[-2:])
+
+    # Again as one division by a power of ten, so it's correctly rounded.
+    scale = np.clip(decimals - exponent.astype(np.int64), 0, len(POWERS) - 1)
+    value = mantissa / POWERS[scale]
+    return np.where(negative, -value, value), ok_Mantissa & ok_Exponent
+
+def Checksums(chars):
+    """
+    The checksum of every line of a _Chars array: the sum of the digits
+    (minus signs count as 1, anything else 0) of the first 68 columns,
+    modulo 10.
+    """
+    return CHECKSUM_VALUES[chars[:LINE_LENGTH - 1]].sum(axis=0) % 10
+
+def Parse(chars1, chars2):
+    """
+    Read every element out of the _Chars arrays of lines 1 and 2. Anything
+    unreadable is left as 0.
+
+    Returns the ELEMENTS structured array and whether all the numbers of
+    each TLE were readable.
+    """
+
+    n = chars1.shape[1]
+    elements = np.zeros(n, dtype=ELEMENTS)
+    readable = np.ones(n, dtype=bool)
+
+    def read(name, value_Ok, required=True):
+        nonlocal readable
+        value, ok = value_Ok
+        elements[name] = np.where(ok, value, 0)
+        if required:
+            readable &= ok
+
+    read("catalog_Number", _Number(chars1[2:7]))
+    elements["classification"] = _Text(chars1[7:8])
+    # Not every object has an international designator.
+    read("launch_year", _Number(chars1[9:11]), required=False)
+    read("launch_num", _Number(chars1[11:14]), required=False)
+    elements["inter_des"] = _Text(chars1[14:17])
+    read("epoch_year", _Number(chars1[18:20]))
+    read("epoch_days", _Number(chars1[20:32]))
+    read("first_derivative", _Number(chars1[33:43]))
+    read("second_derivative", _Exponent(chars1[44:52]))
+    read("drag_term", _Exponent(chars1[53:61]))
+    read("ephemeris_type", _Number(chars1[62:63]))
+    read("set_number", _Number(chars1[64:68]))
+    read("inclination", _Number(chars2[8:16]))
+    read("raan", _Number(chars2[17:25]))
+    read("eccentricity", _Number(chars2[26:33], implied_Point=True))
+    read("perigree", _Number(chars2[34:42]))
+    read("mean_anomaly", _Number(chars2[43:51]))
+    read("mean_motion", _Number(chars2[52:63]))
+    read("revolution_number", _Number(chars2[63:68]))
+
+    # Non digits in the checksum column can't match anything.
+    for name, chars in (("checksum_1", chars1), ("checksum_2", chars2)):
+        column = chars[LINE_LENGTH - 1]
+        elements[name] = np.where((column >= ord("0")) & (column <= ord("9")), column - ord("0"), -1)
+
+    return elements, readable
+
+def Check(chars1, chars2, elements, readable):
+    """
+    Check the TLEs are well formed (see PROBLEMS), all at once, given the
+    _Chars arrays of lines 1 and 2 and what Parse made of them.
+
+    Returns the problem flags of each TLE (0 if it's fine).
+    """
+
+    catalog_Number_2, _ = _Number(chars2[2:7])
+
+    problems = np.zeros(chars1.shape[1], dtype=np.uint8)
+    problems[(chars1[0] != ord("1")) | (chars2[0] != ord("2"))] |= 1
+    problems[(chars1[BLANKS_LINE1] != ord(" ")).any(axis=0)
+             | (chars2[BLANKS_LINE2] != ord(" ")).any(axis=0)] |= 2
+    problems[~readable] |= 4
+    problems[elements["ephemeris_type"] != 0] |= 8
+    problems[elements["catalog_Number"] != catalog_Number_2] |= 16
+    problems[Checksums(chars1) != elements["checksum_1"]] |= 32
+    problems[Checksums(chars2) != elements["checksum_2"]] |= 64
+    return problems
+
+def Problem_Text(flags):
+    """
+    Describe the problems flagged in flags (one value of catalog.problems).
+    """
+    return ", ".join(text for bit, text in PROBLEMS.items() if flags & bit)
+
+class LD_TLECatalog:
+    """
+    The lines and parsed elements of a whole list of TLEs.
+    """
+
+    def __init__(self, line0, line1, line2, check=True):
+        """
+        line0, line1, line2: lists of the strings of each line of the TLEs.
+        check: check the TLEs are well formed now. If False, problems is None
+        until Check() is called (the elements of any bad TLEs may be
+        nonsense in the meantime).
+        """
+
+        self.line0 = list(line0)
+        self.line1 = list(line1)
+        self.line2 = list(line2)
+        assert len(self.line0) == len(self.line1) == len(self.line2)
+        # For getting line i of a TLE without making a list of all three.
+        self.lines = (self.line0, self.line1, self.line2)
+
+        chars1 = _Chars(self.line1)
+        chars2 = _Chars(self.line2)
+        self.elements, self.readable = Parse(chars1, chars2)
+        # Columns of plain python values, made by Column when first asked
+        # for.
+        self.columns = {}
+        log.debug(f"Parsed {len(self)} TLEs")
+
+        self.problems = None
+        if check:
+            self.Check(chars1, chars2)
+
+    def Check(self, chars1=None, chars2=None):
+        """
+        Fill in problems, if it hasn't been already. The _Chars arrays of the
+        lines are remade if they aren't passed in.
+        """
+
+        if self.problems is not None:
+            return self.problems
+        if chars1 is None:
+            chars1 = _Chars(self.line1)
+            chars2 = _Chars(self.line2)
+        self.problems = Check(chars1, chars2, self.elements, self.readable)
+        log.debug(f"Checked {len(self)} TLEs, {np.count_nonzero(self.problems)} with problems")
+        return self.problems
+
+    def __len__(self):
+        return len(self.line0)
+
+    def Column(self, name):
+        """
+        Column of elements as a list of plain python values (str for the text
+        ones), for getting one element of one TLE quickly. Each is converted
+        once, the first time it is asked for.
+        """
+
+        if name not in self.columns:
+            column = self.elements[name]
+            if column.dtype.kind == "S":
+                column = np.char.decode(column)
+            self.columns[name] = column.tolist()
+        return self.columns[name]
+
+    @property
+    def Names(self):
+        """
+        Satellite names (line 0) with the trailing whitespace trimmed off.
+        """
+        return [x.rstrip() for x in self.line0]
+
+    def Problems(self):
+        """
+        List of (row, problem description) of every TLE that failed the
+        checks (which are done now if they haven't been yet).
+        """
+
+        self.Check()
+        return [(row, Problem_Text(self.problems[row])) for row in np.flatnonzero(self.problems)]
+
+def From_Lines(flatlist, check=True):
+    """
+    Make a catalog from the lines of a TLE file (every 3 lines is a TLE,
+    anything left over at the end, like an empty last line, is ignored).
+    Row r of the catalog starts on line 3 * r + 1 (counting from 1).
+    """
+
+    n = len(flatlist) // 3
+    return LD_TLECatalog(flatlist[0:3 * n:3], flatlist[1:3 * n:3], flatlist[2:3 * n:3], check)
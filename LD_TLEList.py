@@ -1,23 +1,115 @@
-import itertools
+import functools
 import logging
 import requests
 import sys
+import threading
+
+import numpy as np
 
 import LD_MyTLE
+import LD_TLECatalog
 
 log = logging.getLogger(__name__)
 
+# How to deal with badly formed TLEs when loading, see LD_TLEList.__init__
+VALIDATE_MODES = ("strict", "quarantine", "deferred")
+
+def _Array(tles):
+    """
+    1D numpy array of objects from a list of them.
+    """
+
+    array = np.empty(len(tles), dtype=object)
+    array[:] = tles
+    return array
+
+def _Trigrams(names):
+    """
+    Every trigram (3 bytes of the utf-8 of a name, as one integer) of every
+    name, and the position in names of the name each came from. Byte rather
+    than character trigrams so it can all be done with numpy, a substring
+    of a name is a substring of its bytes too.
+    """
+
+    encoded = [x.encode() for x in names]
+    text = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.int64)
+    owner = np.repeat(np.arange(len(encoded)), [len(x) for x in encoded])
+    codes = (text[:-2] << 16) | (text[1:-1] << 8) | text[2:]
+    # Only the ones that start and end in the same name.
+    same = owner[:-2] == owner[2:]
+    return codes[same], owner[:-2][same]
+
+def _Index(names, folded, trigrams):
+    """
+    Add the names after the first len(folded) to the search index: the case
+    folded names and the sorted trigram << 32 | ID array. Returns new ones
+    rather than changing the ones passed in.
+    """
+
+    start = len(folded)
+    new = [x.casefold() for x in names[start:]]
+    codes, ids = _Trigrams(new)
+    # Sorted, without repeats (trigrams that are in a name more than once).
+    trigrams = np.sort(np.concatenate([trigrams, (codes << 32) | (ids + start)]))
+    return folded + new, trigrams[np.r_[True, trigrams[1:] != trigrams[:-1]]]
+
 class LD_TLEList:
     """
     Get TLE database from a file (local or internet).
+
+    The TLEs are kept in a numpy array of LD_MyTLE objects in the order they
+    were loaded, so getting one by position is quick and slices are views
+    rather than copies. A TLE's position is its ID, which stays the same
+    when the list is appended to or the TLE is updated (by loading another
+    with the same name), so satellites can be referred to by ID rather than
+    name. IDs never move: a TLE removed by Validate leaves None in its slot
+    (and True in removed), which iterating and searching skip.
+
+    Searching names goes through an index of the (case folded) names by
+    trigram, so only names containing every trigram of the search string
+    have to be looked at. The index is one sorted array of trigram << 32 |
+    ID, so the IDs of the names with a trigram in them (its posting list)
+    are a slice of it.
+
+    The list, names and index are only changed (and searched) while holding
+    lock, so Validate can be run in a background thread.
     """
 
-    def __init__(self, path=None, internet=False):
+    def __init__(self, path=None, internet=False, validate="strict"):
         """
         Get the TLE data and sort it into a nice structure.
+
+        validate: what to do about badly formed TLEs (wrong checksums etc).
+            "strict": AssertionError on the first one, nothing is loaded.
+            "quarantine": leave them out, each is added to quarantine with
+                where it was and what was wrong with it.
+            "deferred": load everything without checking, the checks are
+                done (and any bad TLEs quarantined) by Validate().
         """
 
-        self.tle_Dict = {}
+        if validate not in VALIDATE_MODES:
+            raise ValueError(f"validate must be one of {VALIDATE_MODES}, not {validate}")
+        self.validate = validate
+
+        self.lock = threading.RLock()
+        # The TLEs, in ID order, whether each slot's TLE has been removed,
+        # and the ID of each satellite name (not including removed ones).
+        self.tles = _Array([])
+        self.removed = np.zeros(0, dtype=bool)
+        self.ids = {}
+        # Names in ID order, the same case folded, and the trigram index of
+        # them (see Search_IDs).
+        self.names = []
+        self.folded = []
+        self.trigrams = np.zeros(0, dtype=np.int64)
+        # [source, line number, name, reason] of every bad TLE left out.
+        self.quarantine = []
+        # (source, catalog) of anything loaded but not checked yet.
+        self.unchecked = []
+        # With validate="deferred", the TLE each unchecked one replaced
+        # (by name), keyed by (id of its catalog, row), so Validate can put
+        # it back if the new one turns out to be bad.
+        self.replaced = {}
 
         if (path == "") or isinstance(path, type(None)):
             log.debug(""""
@@ -37,51 +129,184 @@ class LD_TLEList:
         data = open(path).read()
         flatlist = data.split("\n")
 
-        self._Parse_File(flatlist, append)
+        self._Parse_File(flatlist, append, path)
 
     def Load_TLEs_From_URL(self, url, append=False):
         log.info(f"Load TLEs from URL: {url}")
         req = requests.get(url)
         flatlist = req.text.split("\r\n")
 
-        self._Parse_File(flatlist, append)
+        self._Parse_File(flatlist, append, url)
 
-    def _Parse_File(self, flatlist, append):
+    def _Parse_File(self, flatlist, append, source=""):
         """
         Pass in plan text of TLE list. Each line is a TLE element so every 3
         class uses to hold the TLEs.
-        If append is true, it keeps any old values that were in the dict before
-        this function was called. Any duplicates are overwritten (updated?)
+        If append is true, it keeps any old values that were in the list before
+        this function was called. Any duplicates are overwritten (updated?) and
+        keep their ID, anything new goes on the end.
         """
 
-        # Every 3rd line is a satellite name. Extract them and trim the whitespace off.
-        tle_Names = map(lambda x: x.rstrip(), flatlist[0::3])
-        # Reshape the data from the file grouped into threes
-        tle_List = zip(flatlist[0::3], flatlist[1::3], flatlist[2::3])
-
-        # If not appending, clear any previously held values.
-        if not append:
-            self.tle_Dict = {}
-
-        # Put the data into a dict - old way before appending.
-        #self.tle_Dict = {key:LD_MyTLE.LD_MyTLE(data) for (key, data) in zip(tle_Names, tle_List)}
-        # Put the data into a dict - new way, allows appending.
-        for i, (key, data) in enumerate(zip(tle_Names, tle_List)):
-            self.tle_Dict[key] = LD_MyTLE.LD_MyTLE(data)
+        # Parse the whole lot in one go, then each TLE is a view of a row of
+        # the catalog.
+        catalog = LD_TLECatalog.From_Lines(flatlist, check=self.validate != "deferred")
+        if self.validate == "strict":
+            bad = catalog.Problems()
+            if bad:
+                row, reason = bad[0]
+                raise AssertionError(f"TLE at line {3 * row + 1} ({catalog.line0[row].rstrip()}): {reason}")
+
+        with self.lock:
+            # If not appending, clear any previously held values.
+            if not append:
+                self.tles = _Array([])
+                self.removed = np.zeros(0, dtype=bool)
+                self.ids = {}
+                self.names = []
+                self.folded = []
+                self.trigrams = np.zeros(0, dtype=np.int64)
+                self.quarantine = []
+                self.unchecked = []
+                self.replaced = {}
+
+            # Duplicate names overwrite (bad TLEs are skipped so they can't
+            # overwrite good ones).
+            skip = (catalog.problems if self.validate == "quarantine" else np.zeros(len(catalog))).tolist()
+            tles = list(self.tles)
+            for i, key in enumerate(catalog.Names):
+                if skip[i]:
+                    continue
+                tle = LD_MyTLE.LD_MyTLE.From_Catalog(catalog, i)
+                if key in self.ids:
+                    if self.validate == "deferred":
+                        self.replaced[(id(catalog), i)] = tles[self.ids[key]]
+                    tles[self.ids[key]] = tle
+                else:
+                    self.ids[key] = len(tles)
+                    self.names.append(key)
+                    tles.append(tle)
+            self.removed = np.concatenate([self.removed, np.zeros(len(tles) - len(self.tles), dtype=bool)])
+            self.tles = _Array(tles)
+            # Only new names need adding to the search index.
+            self.folded, self.trigrams = _Index(self.names, self.folded, self.trigrams)
+
+            if self.validate == "quarantine":
+                self._Quarantine(source, catalog, np.flatnonzero(catalog.problems))
+            elif self.validate == "deferred":
+                self.unchecked.append((source, catalog))
 
         if append:
-            log.info(f"Added {i} additional TLEs")
+            log.info(f"Added {len(catalog)} additional TLEs")
         log.info(f"List contains {self.__len__()} TLEs")
 
         # Hilarious one liner to do the above:
         # {x.rstrip():(x,y,z) for x,y,z in itertools.zip_longest(*[iter(flatlist)] * 3)}
 
+    def _Quarantine(self, source, catalog, rows):
+        """
+        Add the TLEs in rows of catalog to the quarantine list.
+        """
+
+        for row in rows.tolist():
+            name = catalog.line0[row].rstrip()
+            reason = LD_TLECatalog.Problem_Text(catalog.problems[row])
+            self.quarantine.append([source, 3 * row + 1, name, reason])
+            log.debug(f"Quarantined TLE at line {3 * row + 1} of {source} ({name}): {reason}")
+        if len(rows):
+            log.warning(f"{len(rows)} bad TLEs in {source} left out, see quarantine")
+
+    def Validate(self):
+        """
+        Do the checks on anything loaded with validate="deferred", removing
+        bad TLEs from the list and adding them to quarantine. If a bad TLE
+        replaced one with the same name, the old one is put back instead.
+        Removed TLEs leave their slot empty (see removed) so no other TLE's
+        ID changes. The checks themselves are done without holding lock, so
+        this can be run in a background thread while the list is used.
+
+        Returns the quarantine list.
+        """
+
+        unchecked = list(self.unchecked)
+        for source, catalog in unchecked:
+            catalog.Check()
+
+        def bad(tle):
+            return tle.catalog.problems is not None and tle.catalog.problems[tle.row] != 0
+
+        with self.lock:
+            # Go back through what each bad TLE replaced until there's a
+            # good one (or nothing).
+            tles = list(self.tles)
+            removed = self.removed.copy()
+            for i, tle in enumerate(tles):
+                while tle is not None and bad(tle):
+                    tle = self.replaced.get((id(tle.catalog), tle.row))
+                if tle is None and not removed[i]:
+                    removed[i] = True
+                    del self.ids[self.names[i]]
+                tles[i] = tle
+            self.tles = _Array(tles)
+            self.removed = removed
+
+            for source, catalog in unchecked:
+                self._Quarantine(source, catalog, np.flatnonzero(catalog.problems))
+                self.unchecked.remove((source, catalog))
+            self.replaced = {key: tle for key, tle in self.replaced.items()
+                             if any(id(catalog) == key[0] for _, catalog in self.unchecked)}
+
+        return self.quarantine
+
+    def _Postings(self, code):
+        """
+        IDs of the names with the trigram code in them, in order.
+        """
+
+        first, last = np.searchsorted(self.trigrams, [code << 32, (code + 1) << 32])
+        return self.trigrams[first:last] & 0xFFFFFFFF
+
+    def Search_IDs(self, search_String):
+        """
+        Sorted array of the IDs of all satellites whose names contain a
+        substring (case insensitive).
+        """
+
+        with self.lock:
+            ids = self._Search_IDs(search_String.casefold())
+            return ids[~self.removed[ids]]
+
+    def _Search_IDs(self, search_String):
+        """
+        Search_IDs, with lock held and search_String already case folded.
+        """
+
+        codes, _ = _Trigrams([search_String])
+        if search_String == "":
+            return np.arange(len(self.names))
+        if len(codes) == 0:
+            # Too short for the index, just look through them all.
+            return np.array([i for i, name in enumerate(self.folded) if search_String in name],
+                            dtype=np.int64)
+
+        # Names that have every trigram of the search string in them (the
+        # rarest first so the intersection gets small quickly)...
+        postings = sorted((self._Postings(x) for x in np.unique(codes)), key=len)
+        ids = postings[0]
+        for posting in postings[1:]:
+            ids = np.intersect1d(ids, posting, assume_unique=True)
+        if len(codes) == 1:
+            return ids
+        # ... might still not have them in the right order.
+        return np.array([i for i in ids.tolist() if search_String in self.folded[i]],
+                        dtype=np.int64)
+
     def Search_Keys(self, search_String):
         """
         Return all satellite names that contain a substring (case insensitive)
         """
 
-        search_Keys = list(filter(lambda x: search_String.lower() in x.lower(), self.tle_Dict.keys()))
+        with self.lock:
+            search_Keys = [self.names[i] for i in self.Search_IDs(search_String).tolist()]
         log.info(f"Searched TLE list for {search_String}, found {len(search_Keys)} matching TLE names")
         if search_String != "":
             log.debug(f"Keys are: {search_Keys}")
@@ -96,15 +321,18 @@ class LD_TLEList:
         matching any string is returned.
         """
 
-        if isinstance(search, str):
-            search_Keys = self.Search_Keys(search)
-        elif isinstance(search, (list, tuple, set)):
-            # Search for each keyword individually.
-            searches_List = [self.Search_Keys(this_Search.strip()) for this_Search in search]
-            # Flatten the list and remove duplicates (by making into a set)
-            search_Keys = set(itertools.chain.from_iterable(searches_List))
+        with self.lock:
+            if isinstance(search, str):
+                ids = self.Search_IDs(search)
+            elif isinstance(search, (list, tuple, set)):
+                # Search for each keyword individually, anything matching any
+                # of them.
+                ids = functools.reduce(np.union1d, (self.Search_IDs(this_Search.strip())
+                                                    for this_Search in search), np.zeros(0, dtype=np.int64))
+            result = list(self.tles[ids])
+        log.info(f"Searched TLE list for {search}, found {len(ids)} matching TLEs")
 
-        return [self.Get_TLE(key) for key in search_Keys]
+        return result
 
     def Get_TLE_String(self, key):
         """
@@ -116,25 +344,58 @@ class LD_TLEList:
         """
         Get the TLE of the requested satellite as a My_TLE object.
         """
-        return self.tle_Dict[key]
+
+        with self.lock:
+            return self.tles[self.ids[key]]
+
+    def Get_ID(self, key):
+        """
+        Get the ID of the requested satellite (its position in the list).
+        """
+        return self.ids[key]
 
     def __getitem__(self, index):
         """
-        Mostly this is implemented as an easy way to be able to make this
-        object iterable.
+        TLE by ID (None if it's been removed). Slices (or arrays of IDs) give
+        numpy arrays of the TLEs, slices are views so nothing is copied.
         """
-        return list(self.tle_Dict.values())[index]
+        return self.tles[index]
+
+    def __iter__(self):
+        return iter(self.TLEs)
 
     def __len__(self):
-        return len(self.tle_Dict)
+        """
+        Number of TLEs, not counting removed ones.
+        """
+
+        with self.lock:
+            return len(self.tles) - int(self.removed.sum())
 
     @property
     def Keys(self):
-        return self.tle_Dict.keys()
+        return self.ids.keys()
 
     @property
     def TLEs(self):
-        return self.tle_Dict.values()
+        """
+        Array of the TLEs in ID order, not counting removed ones (a copy if
+        there are any).
+        """
+
+        with self.lock:
+            if self.removed.any():
+                return self.tles[~self.removed]
+            return self.tles
+
+    @property
+    def tle_Dict(self):
+        """
+        The TLEs as a dict of name: LD_MyTLE (made when asked for).
+        """
+
+        with self.lock:
+            return {name: self.tles[i] for name, i in self.ids.items()}
 
 
 if __name__ == "__main__":
@@ -143,6 +404,6 @@ if __name__ == "__main__":
     my_tle_list = LD_TLEList("tle_Files/active.txt")
 
     sat_key = my_tle_list.Search_Keys("resurs-dk")
-    tle = my_tle_list.tle_Dict[sat_key[0]]
+    tle = my_tle_list.Get_TLE(sat_key[0])
 
     print(tle)
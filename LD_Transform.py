@@ -0,0 +1,384 @@
+"""
+Vectorized coordinate transforms for the pass finder.
+
+SGP4 gives satellite positions in the TEME frame. Astropy can convert those
+to alt/az for an observer, but it does so one satellite at a time and
+recomputes all the earth rotation/polar motion stuff for every satellite even
+though it only depends on the time stamps. This computes the rotation
+matrices once per time grid (and the observer's local basis once per site)
+and then applies them to every satellite at once with numpy.
+
+The alt/az here are purely geometric, and agree with astropy's topocentric
+ITRS -> AltAz (an ITRS position relative to the site) to about 1e-10
+arcseconds. The reference mode in LD_PassFinder.Calculate_Passes goes from
+TEME via astropy's geocentric route through CIRS instead, which treats the
+satellite more like a distant object. The differences come from that
+route, not from this module: for visual.txt on the benchmark night
+(astropy 8.0.1) the altitudes were up to 224 arcseconds apart (COSMOS 1892
+at 76.5 degrees, median 14), 2.7% of the samples above the horizon were
+more than 84 arcseconds apart, and the ranges were up to 0.6 km apart.
+
+Usage:
+    - Make an instance with an astropy Time array and an EarthLocation.
+    - Pass TEME positions (n_sats x n_times x 3, km) to TEME_To_AltAz()
+"""
+
+import logging
+
+import astropy
+import astropy.coordinates
+import astropy.time
+import astropy.units
+import numpy as np
+from astropy.utils import iers
+
+log = logging.getLogger(__name__)
+
+# Rotation rate of the earth in rad/s (the value Vallado uses for TEME).
+EARTH_ROTATION = 7.292115146706979e-5
+
+# Speed of light in km/s, for Doppler shifts.
+SPEED_OF_LIGHT = 299792.458
+
+# The Sun and Moon move so slowly in TEME that they only need calculating
+# every this many seconds, with linear interpolation in between.
+BODY_INTERVAL = 600
+
+
+def _Rotation(angle, axis):
+    """
+    Stack of rotation matrices (of the coordinate axes, like erfa's rx/ry/rz)
+    by each of the angles (radians) about axis 0, 1 or 2.
+    """
+
+    angle = np.asarray(angle, dtype=float)
+    c, s = np.cos(angle), np.sin(angle)
+    i, j = [k for k in range(3) if k != axis]
+    mat = np.zeros(angle.shape + (3, 3))
+    mat[..., axis, axis] = 1
+    mat[..., i, i] = c
+    mat[..., j, j] = c
+    # The sign flips for rotations about y because of the axis ordering.
+    sign = -1 if axis == 1 else 1
+    mat[..., i, j] = sign * s
+    mat[..., j, i] = -sign * s
+    return mat
+
+
+def Earth_Orientation(utc_Times):
+    """
+    Get the Greenwich mean sidereal time (1982 model, radians) and the polar
+    motion matrix for every time stamp in utc_Times (an astropy Time array).
+    """
+
+    gst = utc_Times.sidereal_time("mean", longitude=0, model="IAU1982").to_value(astropy.units.rad)
+
+    # Polar motion from the IERS tables. If the times are outside the range
+    # of the tables just assume no polar motion, it's arcsecond level stuff.
+    xp, yp, status = iers.earth_orientation_table.get().pm_xy(utc_Times, return_status=True)
+    xp = np.atleast_1d(xp.to_value(astropy.units.rad))
+    yp = np.atleast_1d(yp.to_value(astropy.units.rad))
+    out_Of_Range = np.atleast_1d(status) < 0
+    if np.any(out_Of_Range):
+        log.warning("Some times are outside the IERS tables, ignoring polar motion for them")
+        xp[out_Of_Range] = 0
+        yp[out_Of_Range] = 0
+    polar_Motion = _Rotation(-yp, 0) @ _Rotation(-xp, 1)
+
+    return gst, polar_Motion
+
+
+def TEME_To_ITRS_Matrices(utc_Times):
+    """
+    Make the TEME to ITRS rotation matrix for every time stamp in utc_Times
+    (an astropy Time array). Returns an (n_times x 3 x 3) array.
+
+    This is the same thing astropy does internally: rotate by the (1982
+    model) Greenwich mean sidereal time, then apply polar motion.
+    """
+
+    gst, polar_Motion = Earth_Orientation(utc_Times)
+    return polar_Motion @ _Rotation(gst, 2)
+
+
+def Site_Basis(location):
+    """
+    Get the ITRS position (km) of an EarthLocation and the matrix whose rows
+    are the local east, north and up unit vectors at that position.
+    """
+
+    lat = location.lat.to_value(astropy.units.rad)
+    lon = location.lon.to_value(astropy.units.rad)
+    position = np.array([x.to_value(astropy.units.km) for x in location.to_geocentric()])
+
+    basis = np.array([
+        [-np.sin(lon), np.cos(lon), 0],
+        [-np.sin(lat) * np.cos(lon), -np.sin(lat) * np.sin(lon), np.cos(lat)],
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+        ])
+    return position, basis
+
+
+def Body_TEME(utc_Times, body="sun", interval=BODY_INTERVAL):
+    """
+    Geocentric position of a solar system body ("sun", "moon", anything
+    astropy's get_body knows) in km, TEME, at every time stamp in utc_Times.
+    Astropy is only asked for it every interval seconds since it hardly
+    moves, the rest are interpolated.
+    """
+
+    if utc_Times.isscalar:
+        utc_Times = utc_Times.reshape(1)
+    seconds = (utc_Times - utc_Times[0]).sec
+    samples = np.arange(0, seconds[-1] + interval, interval)
+    sample_Times = utc_Times[0] + astropy.time.TimeDelta(samples, format="sec")
+    position = astropy.coordinates.get_body(body, sample_Times).transform_to(
+        astropy.coordinates.TEME(obstime=sample_Times))
+    xyz = position.cartesian.xyz.to_value(astropy.units.km)
+    return np.stack([np.interp(seconds, samples, x) for x in xyz], axis=-1)
+
+
+def Range_Rate(site_Position, p_ITRS, v_ITRS):
+    """
+    Rate of change of range (km/s, positive when moving away) of things at
+    ITRS positions p_ITRS (km) moving at v_ITRS (km/s, relative to the
+    rotating ITRS frame) from a site, which doesn't move in ITRS.
+    """
+
+    line_Of_Sight = p_ITRS - site_Position
+    return (np.einsum("...i,...i->...", line_Of_Sight, v_ITRS)
+            / np.linalg.norm(line_Of_Sight, axis=-1))
+
+
+def Doppler_Factor(range_Rate):
+    """
+    Relativistic Doppler factor sqrt((1 + beta) / (1 - beta)), beta = range
+    rate / c, of something moving away at range_Rate km/s. Received
+    wavelength = emitted wavelength * factor, received frequency (or pulse
+    repetition rate) = emitted frequency / factor.
+    """
+
+    beta = np.asarray(range_Rate) / SPEED_OF_LIGHT
+    return np.sqrt((1 + beta) / (1 - beta))
+
+
+def Geocentric(site_Position, site_Basis, alt, az, distance):
+    """
+    The opposite of Topocentric: ITRS positions (km, ... x 3) of things at
+    alt, az (degrees) and range (km) as seen from a site.
+    """
+
+    alt = np.radians(alt)
+    az = np.radians(az)
+    enu = np.stack([np.cos(alt) * np.sin(az),
+                    np.cos(alt) * np.cos(az),
+                    np.sin(alt)], axis=-1) * np.asarray(distance)[..., None]
+    # The basis is orthonormal so its transpose takes ENU back to ITRS.
+    return np.einsum("ji,...j->...i", site_Basis, enu) + site_Position
+
+
+def Rotate(matrices, p):
+    """
+    Apply one (3 x 3) matrix per time stamp to (n_sats x n_times x 3) or
+    (n_times x 3) vectors.
+    """
+
+    return np.einsum("tij,...tj->...ti", matrices, p)
+
+
+def Topocentric(site_Position, site_Basis, p_ITRS):
+    """
+    Get the alt, az (degrees) and range (km) of ITRS positions as seen from
+    a site, given its ITRS position and basis (see Site_Basis).
+    """
+
+    enu = np.einsum("ij,...j->...i", site_Basis, p_ITRS - site_Position)
+    ground = np.hypot(enu[..., 0], enu[..., 1])
+    alt = np.degrees(np.arctan2(enu[..., 2], ground))
+    az = np.degrees(np.arctan2(enu[..., 0], enu[..., 1])) % 360
+    distance = np.hypot(ground, enu[..., 2])
+    return alt, az, distance
+
+
+class LD_Transform:
+    """
+    TEME -> ITRS -> AltAz transforms for many satellites on one time grid.
+    """
+
+    def __init__(self, utc_Times, location):
+        """
+        utc_Times: astropy Time array of the time stamps that the satellite
+        positions will be given at.
+        location: EarthLocation of the observer.
+        """
+
+        log.debug(f"Make frame transforms for {len(utc_Times)} time stamps")
+        self.utc_Times = utc_Times
+        gst, self.polar_Motion = Earth_Orientation(utc_Times)
+        # Unwrapped so sidereal time can be interpolated between time stamps.
+        self.gst = np.unwrap(np.atleast_1d(gst))
+        self.teme_To_ITRS = self.polar_Motion @ _Rotation(self.gst, 2)
+        self.bodies = {}
+        self.Set_Site(location)
+
+    @classmethod
+    def From_Arrays(cls, utc_Times, location, arrays):
+        """
+        Remake a transform from the arrays saved by Arrays() (eg from a cache)
+        without any of the earth orientation calculations.
+        """
+
+        transform = cls.__new__(cls)
+        transform.utc_Times = utc_Times
+        transform.location = location
+        transform.gst = arrays["gst"]
+        transform.polar_Motion = arrays["polar_Motion"]
+        transform.teme_To_ITRS = arrays["teme_To_ITRS"]
+        transform.site_Position = arrays["site_Position"]
+        transform.site_Basis = arrays["site_Basis"]
+        # Bodies have their own prefix so none of the frame arrays (eg
+        # teme_To_ITRS) can be mistaken for one. Entries saved before that
+        # are just ignored and the bodies worked out again when wanted.
+        transform.bodies = {
+            name[len("body_"):]: value for name, value in arrays.items() if name.startswith("body_")
+            }
+        return transform
+
+    def Arrays(self):
+        """
+        Everything that was calculated, as a dict of arrays (see From_Arrays).
+        """
+
+        arrays = {
+            "gst": self.gst,
+            "polar_Motion": self.polar_Motion,
+            "teme_To_ITRS": self.teme_To_ITRS,
+            "site_Position": self.site_Position,
+            "site_Basis": self.site_Basis
+            }
+        for body, position in self.bodies.items():
+            arrays[f"body_{body}"] = position
+        return arrays
+
+    def Set_Site(self, location):
+        """
+        Change the observer without redoing the (expensive) time dependent
+        rotations.
+        """
+
+        self.location = location
+        self.site_Position, self.site_Basis = Site_Basis(location)
+
+    def TEME_To_ITRS(self, p, v=None):
+        """
+        Rotate TEME positions (and optionally velocities) into ITRS. Arrays
+        are (n_sats x n_times x 3), or (n_times x 3) for one satellite.
+        """
+
+        p_ITRS = Rotate(self.teme_To_ITRS, p)
+        if v is None:
+            return p_ITRS
+
+        # ITRS rotates with the earth so take off the velocity due to that.
+        v_ITRS = Rotate(self.teme_To_ITRS, v)
+        v_ITRS[..., 0] += EARTH_ROTATION * p_ITRS[..., 1]
+        v_ITRS[..., 1] -= EARTH_ROTATION * p_ITRS[..., 0]
+        return p_ITRS, v_ITRS
+
+    def ITRS_To_AltAz(self, p_ITRS):
+        """
+        Get the alt, az (degrees) and range (km) of ITRS positions as seen from
+        the observer.
+        """
+
+        return Topocentric(self.site_Position, self.site_Basis, p_ITRS)
+
+    def AltAz_To_ITRS(self, alt, az, distance):
+        """
+        Get back the ITRS positions of things at alt, az and range from the
+        observer (eg the tracks in an LD_AltAzData).
+        """
+
+        return Geocentric(self.site_Position, self.site_Basis, alt, az, distance)
+
+    def Range_Rate(self, p_ITRS, v_ITRS):
+        """
+        Range rate (km/s) of ITRS positions/velocities from the observer.
+        """
+
+        return Range_Rate(self.site_Position, p_ITRS, v_ITRS)
+
+    def Body_ITRS(self, body):
+        """
+        ITRS position (km, n_times x 3) of a solar system body (see
+        Body_TEME) at each time stamp. Only calculated the first time it's
+        asked for.
+        """
+
+        if body not in self.bodies:
+            log.debug(f"Calculating {body} position for {len(self.gst)} time stamps")
+            self.bodies[body] = self.TEME_To_ITRS(Body_TEME(self.utc_Times, body))
+        return self.bodies[body]
+
+    def Sun_ITRS(self):
+        return self.Body_ITRS("sun")
+
+    def Body_AltAz(self, body):
+        """
+        Alt, az (degrees) and range (km) of a solar system body from the
+        observer at each time stamp (geometric, no refraction).
+        """
+
+        return self.ITRS_To_AltAz(self.Body_ITRS(body))
+
+    def Body_RaDec_At(self, body, index):
+        """
+        Topocentric RA/Dec (radians) of a solar system body from the
+        observer at a fractional index into the time stamps (see Matrix_At).
+        RA is from TEME's mean equinox, add the equation of the equinoxes for
+        apparent RA.
+
+        The body is interpolated in TEME, where it hardly moves, rather than
+        ITRS where it goes round once a day.
+        """
+
+        position = self.Body_ITRS(body)
+        index = float(np.clip(index, 0, len(self.gst) - 1))
+        low = int(np.floor(index))
+        high = min(low + 1, len(self.gst) - 1)
+        weight = index - low
+        body_TEME = (self.teme_To_ITRS[low].T @ position[low] * (1 - weight)
+                     + self.teme_To_ITRS[high].T @ position[high] * weight)
+
+        line_Of_Sight = body_TEME - self.Matrix_At(index).T @ self.site_Position
+        ra = np.arctan2(line_Of_Sight[1], line_Of_Sight[0]) % (2 * np.pi)
+        dec = np.arctan2(line_Of_Sight[2], np.hypot(line_Of_Sight[0], line_Of_Sight[1]))
+        return ra, dec
+
+    def TEME_To_AltAz(self, p):
+        """
+        Straight from SGP4 output to alt, az, range.
+        """
+
+        return self.ITRS_To_AltAz(self.TEME_To_ITRS(p))
+
+    def Matrix_At(self, index):
+        """
+        TEME -> ITRS rotation at a fractional index into the time stamps (eg
+        2.5 is halfway between the 3rd and 4th). Sidereal time is linearly
+        interpolated, polar motion changes so slowly that the nearest time
+        stamp's value is used.
+        """
+
+        index = np.clip(index, 0, len(self.gst) - 1)
+        gst = np.interp(index, np.arange(len(self.gst)), self.gst)
+        polar_Motion = self.polar_Motion[int(round(float(index)))]
+        return polar_Motion @ _Rotation(gst, 2)
+
+    def TEME_To_AltAz_At(self, p, index):
+        """
+        As TEME_To_AltAz but for a single TEME position at a time between the
+        time stamps (see Matrix_At).
+        """
+
+        return self.ITRS_To_AltAz(self.Matrix_At(index) @ p)
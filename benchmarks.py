@@ -0,0 +1,217 @@
+"""
+Time each stage of the pass finding pipeline, so changes to LD_PassFinder
+can be checked for speed ups (or slow downs).
+
+Runs entirely offline against the TLE files in tle_Files/ over a fixed time
+range (close to the epochs of those TLEs) at a few time steps. Each stage is
+run a few times and the best time kept. Results go in a JSON file named
+after the git commit, so two commits can be compared.
+
+Usage:
+    python benchmarks.py                    # everything, ~minutes
+    python benchmarks.py --quick            # visual.txt at 1 minute only
+    python benchmarks.py --compare old.json new.json
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import astropy
+import numpy as np
+import sgp4
+from astropy.utils import iers
+
+# No downloading IERS tables (or anything else) mid benchmark.
+iers.conf.auto_download = False
+
+import LD_PassFinder
+
+log = logging.getLogger(__name__)
+
+TLE_FILES = ["visual.txt", "cubesat.txt", "active.txt", "3le.txt"]
+# Time steps in minutes.
+STEPS = [5, 1, 1 / 6]
+# A night near the epochs of the bundled TLEs.
+T_START = "2020-06-11T22:00:00"
+T_STOP = "2020-06-12T04:00:00"
+SITE = (51.456671, -2.601768, 71)
+ALT_FILTER = 30
+
+STAGES = ["load_tles", "search_time_range", "propagate", "frame_transforms",
+          "calculate_passes", "filter_passes", "get_pass_list", "save_pass_list"]
+
+
+def Git_Commit():
+    """
+    Short hash of the current commit, and whether there are uncommitted
+    changes to tracked files.
+    """
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, status.strip() != ""
+
+
+def Best_Of(function, repeat):
+    """
+    Run function repeat times, return the times taken and the last result.
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def Run_Case(tle_File, step, repeat):
+    """
+    Time every stage for one TLE file at one time step (minutes).
+    """
+
+    path = os.path.join("tle_Files", tle_File)
+    stages = {}
+
+    def load():
+        finder = LD_PassFinder.LD_PassFinder()
+        finder.Set_Position(*SITE)
+        finder.Load_TLE_Data(path)
+        return finder
+    stages["load_tles"], finder = Best_Of(load, repeat)
+    sats = list(finder.tle_List.TLEs)
+
+    stages["search_time_range"], _ = Best_Of(
+        lambda: finder.Search_Time_Range(T_START, T_STOP, step), repeat)
+
+    stages["propagate"], (e, p, v) = Best_Of(lambda: finder.Propagate(sats), repeat)
+    del v
+
+    # Start from scratch (no frame cache) each time.
+    stages["frame_transforms"], _ = Best_Of(
+        lambda: finder.Transform_Positions(p, reuse=False), repeat)
+    del p, e
+
+    stages["calculate_passes"], _ = Best_Of(lambda: finder.Calculate_Passes(sats), repeat)
+    stages["filter_passes"], passes = Best_Of(lambda: finder.Filter_Passes(ALT_FILTER), repeat)
+    stages["get_pass_list"], _ = Best_Of(finder.Get_Pass_List, repeat)
+
+    # Save_Pass_List writes into the working directory.
+    here = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        try:
+            stages["save_pass_list"], _ = Best_Of(finder.Save_Pass_List, repeat)
+        finally:
+            os.chdir(here)
+
+    return {
+        "tle_file": tle_File,
+        "step_minutes": step,
+        "n_tles": len(sats),
+        "n_times": len(finder.utc_Time_Series),
+        "n_passes": len(passes),
+        "stages": {name: {"best": min(times), "times": times} for name, times in stages.items()}
+        }
+
+
+def Run(tle_Files, steps, repeat, output):
+    """
+    Run every case and write the results to output (default
+    benchmark_Data/<commit>.json).
+    """
+
+    commit, dirty = Git_Commit()
+    results = {
+        "commit": commit,
+        "dirty": dirty,
+        "date": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "versions": {"numpy": np.__version__, "astropy": astropy.__version__,
+                     "sgp4": sgp4.__version__},
+        "machine": {"platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {"t_start": T_START, "t_stop": T_STOP, "site": SITE,
+                   "alt_filter": ALT_FILTER, "repeat": repeat},
+        "cases": []
+        }
+
+    for tle_File in tle_Files:
+        for step in steps:
+            print(f"{tle_File} at {step:.3g} min steps...", flush=True)
+            case = Run_Case(tle_File, step, repeat)
+            results["cases"].append(case)
+            print("    " + ", ".join(f"{name} {value['best']:.3f}s"
+                                     for name, value in case["stages"].items()))
+
+    if output is None:
+        suffix = "-dirty" if dirty else ""
+        output = os.path.join("benchmark_Data", f"{commit}{suffix}.json")
+    folder = os.path.dirname(output)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+    return results
+
+
+def Compare(old_File, new_File):
+    """
+    Print the new/old ratio of the best time of every stage of every case the
+    two result files have in common (< 1 is faster).
+    """
+
+    with open(old_File) as f:
+        old = json.load(f)
+    with open(new_File) as f:
+        new = json.load(f)
+    print(f"{old['commit']} -> {new['commit']} (new time / old time)")
+
+    old_Cases = {(x["tle_file"], x["step_minutes"]): x for x in old["cases"]}
+    for case in new["cases"]:
+        key = (case["tle_file"], case["step_minutes"])
+        if key not in old_Cases:
+            continue
+        print(f"{key[0]} at {key[1]:.3g} min steps:")
+        for name in STAGES:
+            if name not in case["stages"] or name not in old_Cases[key]["stages"]:
+                continue
+            before = old_Cases[key]["stages"][name]["best"]
+            after = case["stages"][name]["best"]
+            ratio = after / before if before > 0 else float("inf")
+            print(f"    {name:20s} {before:9.4f}s -> {after:9.4f}s  x{ratio:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", nargs="+", default=TLE_FILES, help="TLE files in tle_Files/")
+    parser.add_argument("--steps", nargs="+", type=float, default=STEPS, help="time steps, minutes")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage (best is kept)")
+    parser.add_argument("--output", default=None, help="JSON file to write")
+    parser.add_argument("--quick", action="store_true", help="just visual.txt at 1 minute steps")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    # SGP4 errors on old TLEs would otherwise fill the screen.
+    logging.basicConfig(stream=sys.stdout, level=logging.ERROR)
+
+    if args.compare:
+        Compare(*args.compare)
+    elif args.quick:
+        Run(["visual.txt"], [1], args.repeat, args.output)
+    else:
+        Run(args.files, args.steps, args.repeat, args.output)
@@ -316,8 +316,9 @@ class MyWindow(QtWidgets.QMainWindow):
             # if there's an alt filter in the pass finder, this way the
             # telescope will definitely have found the satellite by the time
             # it's nice and high in the sky)
-            start = line[2].iloc[0].time.to_datetime(tzlocal.get_localzone())
-            stop = line[2].iloc[-1].time.to_datetime(tzlocal.get_localzone())
+            times = line[2]["time"]
+            start = times[0].astimezone(tzlocal.get_localzone())
+            stop = times[-1].astimezone(tzlocal.get_localzone())
 
             # Let the telescope thread know about the waiting pass.
             # (satellite thread then emits which is captured by
@@ -596,7 +597,7 @@ class MyWindow(QtWidgets.QMainWindow):
 
         for sat, peak_Info, data in pass_Data:
             # Make timestamps that matplotlib can understand.
-            x_data = [x.plot_date for x in data["time"].values]
+            x_data = matplotlib.dates.date2num(data["time"])
             # Altitude is the only particularly interesting feature for these
             # purposes (plotting azimuth as well would be confusing)
             y_data = data["alt"]
@@ -37,8 +37,14 @@ class satellites_Thread(QtCore.QThread):
 
         self.degrees = 0
 
-        self.my_TLE_List = LD_TLEList.LD_TLEList()
+        # Downloaded lists sometimes have the odd broken TLE, better to lose
+        # that one than the whole list.
+        self.my_TLE_List = LD_TLEList.LD_TLEList(validate="quarantine")
         self.finder = LD_PassFinder.LD_PassFinder()
+        # Pressing Process again with the same times shouldn't redo the
+        # frame rotations (or any satellite tracks that haven't changed).
+        self.finder.Set_Frame_Cache()
+        self.finder.Set_Track_Cache()
 
     def Load_List(self, filename, internet, append=False):
         log.debug(f"Load TLE list {filename}, append? {append}")
@@ -64,7 +70,9 @@ class satellites_Thread(QtCore.QThread):
         self.finder.Search_Time_Range(self.t_start, self.t_stop, self.t_step)
 
         self.finder.Calculate_Passes(self.tles)
-        self.pass_Data = self.finder.Filter_Passes(alt_Filter=self.degrees)
+        # Look between the time stamps for LEO passes the step is too coarse
+        # to see, it's cheap.
+        self.pass_Data = self.finder.Filter_Passes(alt_Filter=self.degrees, dense=True)
         self.finder.Save_Pass_List()
 
         self.passes_Signal.emit(self.pass_Data)